@@ -1,3 +1,7 @@
+import hashlib
+import heapq
+import itertools
+from collections import OrderedDict, deque
 import numpy as np
 import matplotlib.pyplot as plt
 import tools 
@@ -5,6 +9,16 @@ import tools
 
 clist = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
 
+# the four moves (dx, dy), in the order next_state lists them
+MOVES = [(-1, 0), (0, -1), (0, 1), (1, 0)]
+
+def move_slices(h, w, dx, dy):
+    # slices (dst, src) such that grid[src] is the neighbour (x+dx, y+dy)
+    # of every cell (x, y) in grid[dst] that has one
+    dst = (slice(max(0, -dy), h - max(0, dy)), slice(max(0, -dx), w - max(0, dx)))
+    src = (slice(max(0, dy), h - max(0, -dy)), slice(max(0, dx), w - max(0, -dx)))
+    return dst, src
+
 def updateQ(q1, a1, q2, a2):
     if q1 is None:
         return q2, a2
@@ -18,6 +32,35 @@ class maze():
         self.h = h
         self.w = w
         self.maze_array = np.zeros([h,w], dtype=np.uint8)
+        self._key = None    # cached content_key, reset whenever a block changes
+        self.listeners = [] # called as listener(x, y) after a block is flipped
+        self._renderer = None
+
+    def subscribe(self, listener):
+        # call listener(x, y) after each flip_block, and listener(None, None)
+        # after set_array replaces every block
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        # stop calling a listener given to subscribe
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def content_key(self):
+        # a key that is equal for mazes with the same size and blocks; if
+        # maze_array is changed directly rather than through flip_block or
+        # set_array, reset _key to None
+        if self._key is None:
+            digest = hashlib.blake2b(digest_size=16)
+            if self.maze_array.flags.c_contiguous:
+                digest.update(self.maze_array)
+            else:
+                # a view such as a mapped maze file (see mazefile); hash it a
+                # row at a time rather than copying it
+                for row in self.maze_array:
+                    digest.update(np.ascontiguousarray(row))
+            self._key = (self.h, self.w, digest.digest())
+        return self._key
 
     def flip_block(self, x, y):
         idx_h = y
@@ -27,8 +70,13 @@ class maze():
             return 
 
         self.maze_array[idx_h, idx_w] = 1- self.maze_array[idx_h, idx_w]
+        self._key = None
+        for listener in list(self.listeners):
+            listener(x, y)
 
-    def set_array(self, map):    
+    def set_array(self, map, copy=True):    
+        # with copy=False, a uint8 array of 0s and 1s (such as a mapped maze
+        # file, see mazefile) becomes maze_array as it is
         if len(map.shape) > 2:
             print('invalid array of shape', map.shape)
             return
@@ -37,18 +85,24 @@ class maze():
             print('invalid array of shape', map.shape)
             return
 
-        self.maze_array = np.array(map>0.5, dtype=np.uint8)  
+        if copy or map.dtype != np.uint8:
+            self.maze_array = np.array(map>0.5, dtype=np.uint8)  
+        else:
+            self.maze_array = map
+        self._key = None
+        for listener in list(self.listeners):
+            listener(None, None)
+
+    def renderer(self, ax: plt.Axes):
+        # the tools.maze_renderer that draws this maze on ax, made on first use
+        if self._renderer is None or self._renderer.ax is not ax:
+            if self._renderer is not None:
+                self._renderer.disconnect()
+            self._renderer = tools.maze_renderer(ax, self)
+        return self._renderer
 
     def show_maze(self, ax: plt.Axes):    
-        ax.plot([0, 0], [0, self.h], color=clist[0])
-        ax.plot([self.w, self.w], [0, self.h], color=clist[0])
-        ax.plot([0, self.w], [0, 0], color=clist[0])
-        ax.plot([0, self.w], [self.h, self.h], color=clist[0])
-
-        for i in range(self.h):
-            for j in range(self.w):
-                if self.maze_array[i,j]:
-                    tools.plot_block(ax, j, i, clist[0])
+        self.renderer(ax).draw()
 
     def next_state(self, x, y):
         ret = []
@@ -72,25 +126,177 @@ class maze():
         return False        
 
 class Q_learning_maze():
+    # states are the open cells that have somewhere to move to, numbered
+    # 0..n-1: first those of one colour of a checkerboard, then those of the
+    # other (see parts), each in row-major order. id[y, x] is the number of
+    # the state at (x, y), -1 if it is not one, and cell[i] is where state i
+    # is in the flattened grid. next[d, i] is the state MOVES[d] leads to from
+    # state i, n where that move is not allowed. Q[d, i], V[i] and
+    # best_move[i] are the values and policy of state i; the dicts Q_s_a, V_s
+    # and policy are built from them on demand
     def __init__(self, MAZE: maze, desti):
         self.MAZE = MAZE
         self.desti = desti
         self.gamma = 0.9
-        self.Q_s_a = {}     
-        self.V_s = {}
-        self.policy = {}
-        
-        for x in range(self.MAZE.w):
-            for y in range(self.MAZE.h):
-                state = (x, y)
-                actions = self.MAZE.next_state(x, y)
-                if len(actions) < 1:
-                    continue
-                self.Q_s_a[state] = {}      # Q 
-                self.V_s[state] = 0         # V
-                self.policy[state] = None    
-                for a in actions:
-                    self.Q_s_a[state][a] = 0
+        h, w = MAZE.h, MAZE.w
+
+        open_cell = MAZE.maze_array == 0
+        is_state = np.zeros([h, w], dtype=bool)
+        for dx, dy in MOVES:
+            dst, src = move_slices(h, w, dx, dy)
+            is_state[dst] |= open_cell[dst] & open_cell[src]
+        # cells of one colour of a checkerboard only have neighbours of the
+        # other, so each colour can be updated at once in a Gauss-Seidel sweep
+        colour = np.indices([h, w]).sum(axis=0) % 2 == 1
+        first = np.flatnonzero(is_state & ~colour)
+        self.cell = np.concatenate([first, np.flatnonzero(is_state & colour)]).astype(np.int32)
+        n = self.n = len(self.cell)
+        self.parts = (slice(0, len(first)), slice(len(first), n))
+        self.id = np.full([h, w], -1, dtype=np.int32)
+        self.id.flat[self.cell] = np.arange(n, dtype=np.int32)
+
+        self.next = np.empty([4, n], dtype=np.int32)
+        target = np.empty([h, w], dtype=np.int32)
+        for d, (dx, dy) in enumerate(MOVES):
+            # moves are allowed between neighbouring states
+            target.fill(-1)
+            dst, src = move_slices(h, w, dx, dy)
+            target[dst] = self.id[src]
+            self.next[d] = target.flat[self.cell]
+        self.next[self.next < 0] = n
+        # if we arrive, reward is 0 otherwise -1
+        x, y = desti
+        self.goal = int(self.id[y, x]) if 0 <= x < w and 0 <= y < h else -1
+        self.reward = np.where(self.next == self.goal, 0, -1).astype(np.int8)
+
+        self.Q = np.where(self.next < n, 0.0, -np.inf)
+        self.V = np.zeros(n)
+        self.best_move = None   # index into MOVES per state, once computed
+        self.sweeps = 0         # sweeps done so far
+        self.residuals = []     # largest change of V in each sweep
+
+    def states(self):
+        # the (x, y) of every state
+        w = self.MAZE.w
+        return [(i % w, i // w) for i in self.cell.tolist()]
+
+    @property
+    def Q_s_a(self):
+        ret = {}
+        for s, q, nxt in zip(self.states(), self.Q.T.tolist(), self.next.T.tolist()):
+            x, y = s
+            ret[s] = {(x+dx, y+dy): q[d] for d, (dx, dy) in enumerate(MOVES) if nxt[d] < self.n}
+        return ret
+
+    @property
+    def V_s(self):
+        return dict(zip(self.states(), self.V.tolist()))
+
+    @property
+    def policy(self):
+        if self.best_move is None:
+            return dict.fromkeys(self.states())
+        ret = {}
+        for (x, y), d in zip(self.states(), self.best_move.tolist()):
+            dx, dy = MOVES[d]
+            ret[(x, y)] = (x+dx, y+dy)
+        return ret
+
+    def Q_grid(self):
+        # Q as a 4 x h x w array indexed [d, y, x], -inf where MOVES[d] is not
+        # allowed or (x, y) is not a state
+        h, w = self.MAZE.h, self.MAZE.w
+        ret = np.full([4, h*w], -np.inf)
+        ret[:, self.cell] = self.Q
+        return ret.reshape(4, h, w)
+
+    def backup(self, part=slice(None)):
+        # update Q and the policy of the states in part (a slice of state
+        # numbers) from V, and return the V they give those states
+        V = np.append(self.V, -np.inf)  # V[n] for the moves not allowed
+        Q = self.Q[:, part]
+        np.multiply(V[self.next[:, part]], self.gamma, out=Q)
+        Q += self.reward[:, part]
+        new_V = Q.max(axis=0)
+        if self.best_move is None:
+            self.best_move = np.zeros(self.n, dtype=np.int8)
+        # ties go to the last of the best moves, as in updateQ
+        best = self.best_move[part]
+        best.fill(0)
+        for d in range(1, 4):
+            best[Q[d] == new_V] = d
+        return new_V
+
+    def sweep(self, method='jacobi'):
+        # one sweep over all states, returning the largest change of V:
+        # 'jacobi' updates every state from the V of the last sweep,
+        # 'gauss-seidel' updates one checkerboard colour and then the other
+        # from the V the first colour gives, which converges in fewer sweeps
+        old_V = self.V
+        if method == 'jacobi':
+            self.V = self.backup()
+        elif method == 'gauss-seidel':
+            self.V = old_V.copy()
+            for part in self.parts:
+                self.V[part] = self.backup(part)
+        else:
+            raise ValueError('unknown sweep method %r' % method)
+        residual = float(np.abs(self.V - old_V).max()) if self.V.size else 0.0
+        self.sweeps += 1
+        self.residuals.append(residual)
+        return residual
+
+    def prioritized_sweeping(self, tol=1e-6, loop=None):
+        # update one state at a time, always the one whose value is most out
+        # of date, until no state would change by tol or more (or loop
+        # sweeps' worth of updates are done); each residual recorded is the
+        # largest change among a sweep's worth of updates. It needs far fewer
+        # updates than sweeping, but makes them one at a time in Python
+        n = self.n
+        gamma = self.gamma
+        if n == 0:
+            return 0    # no states, so nothing to update
+        if self.sweeps == 0:
+            # start from the value of never arriving, which every state is at
+            # least worth; values then only rise, nearest the destination
+            # first, and most states are only updated a few times
+            self.V = np.full(n, -1 / (1 - gamma))
+        nxt = [[j for j in row if j < n] for row in self.next.T.tolist()]
+        goal = self.goal
+        V = self.V.tolist()
+
+        def value(i):
+            return max(gamma*V[j] + (0 if j == goal else -1) for j in nxt[i])
+
+        heap = []
+        error = np.abs(self.backup() - self.V)
+        for i in np.nonzero(error >= tol)[0].tolist():
+            heapq.heappush(heap, (-error[i], i))
+        updates, largest = 0, 0.0
+        while heap and (loop is None or updates < loop * n):
+            _, i = heapq.heappop(heap)
+            v = value(i)
+            change = abs(v - V[i])
+            if change < tol:
+                continue    # already brought up to date
+            V[i] = v
+            updates += 1
+            largest = max(largest, change)
+            if updates % n == 0:
+                self.sweeps += 1
+                self.residuals.append(largest)
+                largest = 0.0
+            # the states that can move here are the ones whose values change
+            for j in nxt[i]:
+                e = abs(value(j) - V[j])
+                if e >= tol:
+                    heapq.heappush(heap, (-e, j))
+        if updates % n:
+            self.sweeps += 1
+            self.residuals.append(largest)
+        self.V = np.array(V, dtype=float)
+        self.backup()
+        return updates
 
     def reward_score(self, state, action):
         # if we arrive, reward is 0 otherwise -1
@@ -102,30 +308,185 @@ class Q_learning_maze():
     def state_transform(self, state, action):
         return action # next state is just the action       
 
-    def value_iteration(self, loop=10, ax=None):
-        for idx in range(loop):
-            Q_loop = []
-            for s in self.V_s:
-                best_act = None
-                best_Q = None
-                for a in self.Q_s_a[s]:
-                    next_s = self.state_transform(s, a)
-                    self.Q_s_a[s][a] = (self.gamma*self.V_s[next_s] + self.reward_score(s, a))
-                    best_Q, best_act = updateQ(best_Q, best_act, self.Q_s_a[s][a], a)
-                    Q_loop.append(np.absolute(best_Q))
-                self.policy[s] = best_act
-
-            for s in self.V_s:
-                self.V_s[s] = self.Q_s_a[s][self.policy[s]]    
-
-            plt.cla()
-            self.MAZE.show_maze(ax)
-            for s in self.V_s:
-                tools.show_state_q(ax, s, self.Q_s_a[s])
-        
-            plt.show()
-            plt.pause(0.05)
+    def value_iteration(self, loop=10, ax=None, tol=None, method='jacobi',
+                        render=None, render_every=1):
+        # run loop sweeps, or with tol, sweep until V changes by less than tol
+        # (at most loop sweeps, unless loop is None); method is 'jacobi',
+        # 'gauss-seidel' or 'prioritized' (see sweep and prioritized_sweeping)
+        # and the number of sweeps done is returned.
+        # render(self) is called every render_every sweeps, or only once at
+        # the end if render_every is None; with ax and no render, it draws on
+        # ax, and with neither, nothing is drawn at all
+        if loop is None and tol is None and method != 'prioritized':
+            raise ValueError('value iteration needs loop or tol to stop')
+        if render is None and ax is not None:
+            render = lambda solver: solver.show(ax)
+        start = self.sweeps
+        drawn = start
+        if method == 'prioritized':
+            self.prioritized_sweeping(1e-6 if tol is None else tol, loop)
+        else:
+            for idx in (range(loop) if loop is not None else itertools.count()):
+                residual = self.sweep(method)
+                if render is not None and render_every and (self.sweeps - start) % render_every == 0:
+                    render(self)
+                    drawn = self.sweeps
+                if tol is not None and residual < tol:
+                    break
+        if render is not None and drawn != self.sweeps:
+            render(self)
+        return self.sweeps - start
+
+    def show(self, ax):
+        render = self.MAZE.renderer(ax)
+        Q = self.Q_grid()
+        render.set_q(Q, Q > -np.inf)
+        render.draw()
+
+
+class BFS_maze():
+    # the exact number of moves from every cell to desti, found by one
+    # breadth first search over the moves of next_state (which can be taken
+    # either way); dist is -1 where desti can't be reached
+    def __init__(self, MAZE: maze, desti):
+        self.MAZE = MAZE
+        self.desti = desti
+        h, w = MAZE.h, MAZE.w
+        blocked = MAZE.maze_array.ravel().tolist()
+        dist = [-1] * (h*w)
+        x, y = desti
+        if 0 <= x < w and 0 <= y < h and not blocked[y*w + x]:
+            dist[y*w + x] = 0
+            queue = deque([y*w + x])
+            while queue:
+                i = queue.popleft()
+                d = dist[i] + 1
+                x = i % w
+                # the four moves, in the order of MOVES
+                for j, inside in ((i-1, x > 0), (i-w, i >= w), (i+w, i+w < h*w), (i+1, x < w-1)):
+                    if inside and dist[j] < 0 and not blocked[j]:
+                        dist[j] = d
+                        queue.append(j)
+        self.dist = np.array(dist, dtype=np.int32).reshape(h, w)
+
+    def path(self, start):
+        # the cells of a shortest path from start to desti, or None if there
+        # is none; ties go to the first move in MOVES
+        x, y = start
+        h, w = self.MAZE.h, self.MAZE.w
+        if not (0 <= x < w and 0 <= y < h) or self.dist[y, x] < 0:
+            return None
+        ret = [(x, y)]
+        for d in range(int(self.dist[y, x]) - 1, -1, -1):
+            for dx, dy in MOVES:
+                if 0 <= x+dx < w and 0 <= y+dy < h and self.dist[y+dy, x+dx] == d:
+                    x, y = x+dx, y+dy
+                    break
+            ret.append((x, y))
+        return ret
+
+class incremental_maze(BFS_maze):
+    # a BFS_maze that subscribes to its maze and repairs dist after each
+    # flip_block in the style of LPA*: g is the distance of each cell as last
+    # settled and rhs the distance its neighbours' g give it; only cells where
+    # they disagree are queued, so a flip only visits the cells whose
+    # distance it changes (and their neighbours)
+    def __init__(self, MAZE: maze, desti):
+        BFS_maze.__init__(self, MAZE, desti)
+        self.reset()
+        MAZE.subscribe(self.block_flipped)
+
+    def close(self):
+        # stop following the maze's flips, so the maze no longer keeps this
+        # alive or repairs it
+        self.MAZE.unsubscribe(self.block_flipped)
+
+    def reset(self):
+        # take dist as settled for the blocks the maze has now
+        inf = float('inf')
+        x, y = self.desti
+        h, w = self.MAZE.h, self.MAZE.w
+        self.goal = y*w + x if 0 <= x < w and 0 <= y < h else -1
+        self.blocked = self.MAZE.maze_array.ravel().tolist()
+        self.g = [inf if d < 0 else d for d in self.dist.ravel().tolist()]
+        self.rhs = list(self.g)
+        self.queue = []
+        self.changed = 0    # cells whose distance the last repair changed
+
+    def block_flipped(self, x, y):
+        if x is None:
+            BFS_maze.__init__(self, self.MAZE, self.desti)
+            self.reset()
+            return
+        i = y*self.MAZE.w + x
+        self.blocked[i] = int(self.MAZE.maze_array[y, x])
+        self.update(i)
+        for j in self.neighbours(i):
+            self.update(j)
+        self.repair()
+
+    def neighbours(self, i):
+        h, w = self.MAZE.h, self.MAZE.w
+        x = i % w
+        return [j for j, inside in ((i-1, x > 0), (i-w, i >= w), (i+w, i+w < h*w), (i+1, x < w-1))
+                if inside]
+
+    def update(self, i):
+        # recompute rhs of cell i and queue it if it is no longer settled
+        g, rhs = self.g, self.rhs
+        if self.blocked[i]:
+            rhs[i] = float('inf')
+        elif i == self.goal:
+            rhs[i] = 0
+        else:
+            rhs[i] = min([g[j] for j in self.neighbours(i) if not self.blocked[j]], default=float('inf')) + 1
+        if g[i] != rhs[i]:
+            heapq.heappush(self.queue, (min(g[i], rhs[i]), i))
+
+    def repair(self):
+        # settle the queued cells, nearest first
+        g, rhs = self.g, self.rhs
+        w = self.MAZE.w
+        self.changed = 0
+        while self.queue:
+            key, i = heapq.heappop(self.queue)
+            if g[i] == rhs[i] or key != min(g[i], rhs[i]):
+                continue    # settled since it was queued, or queued again
+            if g[i] > rhs[i]:
+                g[i] = rhs[i]   # a shorter way was found
+            else:
+                g[i] = float('inf')  # the way it had is gone; find it again
+                self.update(i)
+            self.dist[i // w, i % w] = -1 if g[i] == float('inf') else g[i]
+            self.changed += 1
+            for j in self.neighbours(i):
+                self.update(j)
+
+class path_service():
+    # answers many start -> destination queries on a few maps, keeping the
+    # BFS_maze of the maxsize (map, destination) pairs used most recently,
+    # so each query on a known pair only walks its path
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.fields = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def field(self, MAZE: maze, desti):
+        key = (MAZE.content_key(), tuple(desti))
+        field = self.fields.get(key)
+        if field is None:
+            self.misses += 1
+            field = self.fields[key] = BFS_maze(MAZE, desti)
+            if len(self.fields) > self.maxsize:
+                self.fields.popitem(last=False)
+        else:
+            self.hits += 1
+            self.fields.move_to_end(key)
+        return field
 
+    def path(self, MAZE: maze, start, desti):
+        return self.field(MAZE, desti).path(start)
 
 
 if __name__ =='__main__':
@@ -143,9 +504,7 @@ if __name__ =='__main__':
         tmp.strip()
         block = (int(v) for v in tmp.split()) 
         MAZE.flip_block(*block)
-        plt.cla()
         MAZE.show_maze(ax)
-        plt.show()
         modify_map = (input('continue modification?(y/n):') == 'y')
 
     start = (-1, -1)
@@ -161,18 +520,25 @@ if __name__ =='__main__':
         desti = tuple(int(v) for v in tmp.split())       
 
     solver = Q_learning_maze(MAZE=MAZE, desti=desti)
-    solver.value_iteration(loop=30, ax=ax)    
+    solver.value_iteration(loop=None, ax=ax, tol=1e-3, method='gauss-seidel')
 
-    tools.plot_block(ax, start[0], start[1], clist[1])
-    tools.plot_block(ax, desti[0], desti[1], clist[2])
-    plt.show()    
+    render = MAZE.renderer(ax)
+    render.mark(start, clist[1])
+    render.mark(desti, clist[2])
+    render.draw()
 
     state = start
-    while state != desti:
+    policy = solver.policy
+    # the policy leads to desti once the values have converged; stop the walk
+    # if it would go round in circles instead
+    visited = {start}
+    while state != desti and policy[state] not in visited:
+        visited.add(policy[state])
         old_s = (state[0], state[1])
-        state = solver.policy[state]
+        state = policy[state]
         #print(state)
-        tools.show_move(ax, old_s, state)
+        render.add_move(old_s, state)
+    render.draw()
 
     plt.ioff()
 
@@ -0,0 +1,143 @@
+import os
+import struct
+import numpy as np
+from maze import maze
+
+# a maze file is a 16 byte header (MAGIC, h, w, encoding) and then the rows of
+# the maze from the top (y = h-1) down, the order text and images list them
+# in, with 1 for a block and 0 for an open cell:
+# BYTES has one byte per cell, so the rows are maze_array upside down, and
+# load_maze maps the file and uses it (through a view that turns it the right
+# way up) as maze_array without reading or copying it; BITS packs each row
+# into (w+7)//8 bytes, first cell in the high bit, which is 8 times smaller
+# to store or send, but maze works on one byte per cell, so load_maze has to
+# unpack the whole file into memory. BYTES is the default; BITS is for
+# archiving and moving mazes around
+MAGIC = b'MAZE'
+HEADER = struct.Struct('<4sIIB3x')
+BITS, BYTES = 0, 1
+
+def write_rows(path, rows, encoding=BYTES):
+    # write the rows from the iterable rows (arrays of w cells, nonzero for a
+    # block), top row first, to a maze file, one at a time, and return (h, w);
+    # the file is written next to path and only moved there once it is
+    # complete, so a failed write leaves nothing behind
+    h, w = 0, None
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        with open(tmp, 'wb') as out:
+            out.write(HEADER.pack(MAGIC, 0, 0, encoding))
+            for row in rows:
+                row = np.asarray(row) != 0
+                if w is None:
+                    w = len(row)
+                elif len(row) != w:
+                    raise ValueError('row %d has %d cells, not %d' % (h, len(row), w))
+                if encoding == BITS:
+                    out.write(np.packbits(row).tobytes())
+                else:
+                    out.write(row.astype(np.uint8).tobytes())
+                h += 1
+            w = w or 0
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, h, w, encoding))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return h, w
+
+def save_maze(MAZE: maze, path, encoding=BYTES):
+    write_rows(path, MAZE.maze_array[::-1], encoding)
+
+def read_header(path):
+    # (h, w, encoding) of a maze file
+    with open(path, 'rb') as f:
+        head = f.read(HEADER.size)
+    if len(head) < HEADER.size or head[:4] != MAGIC:
+        raise ValueError('%s is not a maze file' % path)
+    _, h, w, encoding = HEADER.unpack(head)
+    if encoding not in (BITS, BYTES):
+        raise ValueError('%s has unknown encoding %d' % (path, encoding))
+    return h, w, encoding
+
+def load_maze(path, mode='c'):
+    # a maze read from a maze file by mapping it into memory. For BYTES the
+    # mapping is maze_array itself, so nothing is read until it is used and
+    # nothing is copied: with mode 'c' flip_block changes only this maze, with
+    # 'r+' it writes to the file too, and with 'r' the maze can't be changed.
+    # BITS files are unpacked from the mapping into a new array
+    h, w, encoding = read_header(path)
+    MAZE = maze(h, w)
+    if h == 0 or w == 0:
+        return MAZE
+    if encoding == BITS:
+        bits = np.memmap(path, dtype=np.uint8, mode='r', offset=HEADER.size, shape=(h, (w+7)//8))
+        MAZE.set_array(np.unpackbits(bits[::-1], axis=1, count=w), copy=False)
+    else:
+        rows = np.memmap(path, dtype=np.uint8, mode=mode, offset=HEADER.size, shape=(h, w))
+        MAZE.set_array(rows[::-1], copy=False)
+    return MAZE
+
+def text_rows(src, blocks='#'):
+    # the rows of a text maze, one line per row, top row first, where the
+    # characters in blocks are blocks and any others open cells; blank lines
+    # are skipped
+    codes = np.frombuffer(blocks.encode('latin-1'), dtype=np.uint8)
+    with open(src, encoding='latin-1') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if line:
+                yield np.isin(np.frombuffer(line.encode('latin-1'), dtype=np.uint8), codes)
+
+def image_rows(src, threshold=0.5):
+    # the rows of an image maze, top row first, where pixels darker than
+    # threshold (0 black to 1 white) are blocks. Binary PBM and PGM files are
+    # read a row at a time; other images are read whole by PIL
+    with open(src, 'rb') as f:
+        magic = f.read(2)
+        if magic in (b'P4', b'P5'):
+            yield from netpbm_rows(f, magic, threshold)
+            return
+    from PIL import Image
+    grey = np.asarray(Image.open(src).convert('L'))
+    for row in grey:
+        yield row < threshold*255
+
+def netpbm_rows(f, magic, threshold):
+    # the rows of a binary PBM (P4) or PGM (P5) file f, read past its magic
+    fields = []
+    while len(fields) < (2 if magic == b'P4' else 3):
+        c = f.read(1)
+        if c == b'#':
+            f.readline()
+        elif c.isspace():
+            pass
+        elif c.isdigit():
+            field = c
+            c = f.read(1)
+            while c.isdigit():
+                field += c
+                c = f.read(1)
+            fields.append(int(field))
+            if c == b'#':
+                f.readline()
+        else:
+            raise ValueError('bad netpbm header')
+    w, h = fields[0], fields[1]
+    if magic == b'P4':
+        # PBM rows are already packed, with 1 for black
+        for y in range(h):
+            yield np.unpackbits(np.frombuffer(f.read((w+7)//8), dtype=np.uint8), count=w)
+    else:
+        maxval = fields[2]
+        dtype = np.dtype('>u2' if maxval > 255 else 'u1')
+        for y in range(h):
+            yield np.frombuffer(f.read(w*dtype.itemsize), dtype=dtype) < threshold*maxval
+
+def text_to_maze_file(src, path, blocks='#', encoding=BYTES):
+    return write_rows(path, text_rows(src, blocks), encoding)
+
+def image_to_maze_file(src, path, threshold=0.5, encoding=BYTES):
+    return write_rows(path, image_rows(src, threshold), encoding)
@@ -1,5 +1,9 @@
 import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.colors import ListedColormap, NoNorm
+from matplotlib.patches import PathPatch
+from matplotlib.path import Path
 
 clist = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
 
@@ -39,3 +43,103 @@ def show_state_q(ax, s, q_a):
         show_q(ax, s, alist[i], i-len(alist))
 
 
+class maze_renderer():
+    # draws a maze with three artists whatever its size: the blocks (and
+    # marked cells) as one image, the Q value arrows as one path and the moves
+    # of a walk as a LineCollection. draw() only changes their data and
+    # redraws them over a saved copy of the empty axes (blitting), instead of
+    # clearing the axes and adding an artist per block and per arrow
+    def __init__(self, ax: plt.Axes, MAZE):
+        self.ax = ax
+        self.MAZE = MAZE
+        h, w = MAZE.h, MAZE.w
+        self.marks = {}     # (x, y) -> index into clist of a marked cell
+        self.moves = []     # (s1, s2) of each move shown
+        self.arrows = None  # (bases, mids, dirs, flat index into Q) per arrow,
+                            # and the can_move they were laid out for
+        self.no_arrows = Path(np.zeros([0, 2]))
+
+        # image value 0 is an open cell and 1+i is a cell of colour clist[i]
+        self.image = ax.imshow(np.zeros([h, w], dtype=np.uint8), cmap=ListedColormap(['white'] + clist),
+                               norm=NoNorm(), origin='lower', extent=(0, w, 0, h),
+                               interpolation='nearest', animated=True)
+        # the arrows are added with no path, as adding a patch walks its path
+        self.q_lines = PathPatch(self.no_arrows, fill=False, edgecolor=clist[7],
+                                 linewidth=plt.rcParams['lines.linewidth'], animated=True)
+        self.move_lines = LineCollection([], colors=clist[5], animated=True)
+        ax.add_patch(self.q_lines)
+        ax.add_collection(self.move_lines)
+        ax.plot([0, w, w, 0, 0], [0, 0, h, h, 0], color=clist[0])
+        ax.set_xlim(-0.5, w + 0.5)
+        ax.set_ylim(-0.5, h + 0.5)
+
+        self.background = None
+        # a full redraw (the first one, or after a resize) leaves out the
+        # animated artists, so take a new background then and draw them on it
+        self.cid = ax.figure.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def disconnect(self):
+        # stop taking backgrounds, once another renderer draws on the figure
+        self.ax.figure.canvas.mpl_disconnect(self.cid)
+
+    def mark(self, s, c):
+        # show cell s in colour c, one of clist
+        self.marks[tuple(s)] = clist.index(c)
+
+    def add_move(self, s1, s2):
+        self.moves.append((s1, s2))
+
+    def set_q(self, Q, can_move):
+        # show Q values as show_state_q does: for each allowed move, a
+        # chevron from the edge it crosses towards the next cell, longer the
+        # better the move ranks among its state's moves. Q[d, y, x] is the
+        # value of MOVES[d] (as in maze.py) at (x, y), where can_move[d, y, x]
+        if Q is None:
+            self.arrows = None
+            self.q_lines.set_path(self.no_arrows)
+            return
+        if self.arrows is None or not np.array_equal(self.arrows[4], can_move):
+            d, y, x = np.nonzero(can_move)
+            dirs = np.array([(-1, 0), (0, -1), (0, 1), (1, 0)], dtype=float)[d]
+            mids = np.stack([x, y], axis=1) + 0.5 + dirs / 2
+            side = np.abs(dirs[:, ::-1]) * 0.1
+            bases = np.stack([mids - side, mids + side], axis=1)
+            self.arrows = (bases, mids, dirs, np.ravel_multi_index((d, y, x), can_move.shape),
+                           can_move.copy())
+        bases, mids, dirs, flat, _ = self.arrows
+        # rank of each move among the four at its cell, moves that are not
+        # allowed (-inf) lowest; the allowed move of rank r out of n is drawn
+        # with length exp(r - n), the same as exp(rank - 4)
+        order = np.argsort(np.where(can_move, Q, -np.inf), axis=0, kind='stable')
+        rank = np.empty_like(order)
+        np.put_along_axis(rank, order, np.arange(4).reshape(4, 1, 1), axis=0)
+        tips = mids + dirs * np.exp(rank.ravel()[flat] - 4.0)[:, None]
+        # each chevron is one line of the path: base, tip, other base
+        vertices = np.stack([bases[:, 0], tips, bases[:, 1]], axis=1).reshape(-1, 2)
+        codes = np.tile(np.array([Path.MOVETO, Path.LINETO, Path.LINETO], dtype=Path.code_type), len(tips))
+        self.q_lines.set_path(Path(vertices, codes))
+
+    def draw(self):
+        data = np.array(self.MAZE.maze_array, dtype=np.uint8)
+        for (x, y), c in self.marks.items():
+            data[y, x] = 1 + c
+        self.image.set_data(data)
+        self.move_lines.set_segments([[(x1+0.5, y1+0.5), (x2+0.5, y2+0.5)]
+                                      for (x1, y1), (x2, y2) in self.moves])
+
+        canvas = self.ax.figure.canvas
+        if self.background is None:
+            canvas.draw()   # calls on_draw
+        else:
+            canvas.restore_region(self.background)
+            self.draw_artists()
+            canvas.blit(self.ax.bbox)
+        canvas.flush_events()
+
+    def on_draw(self, event):
+        self.background = event.canvas.copy_from_bbox(self.ax.bbox)
+        self.draw_artists()
+
+    def draw_artists(self):
+        for artist in (self.image, self.q_lines, self.move_lines):
+            self.ax.draw_artist(artist)
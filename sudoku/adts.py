@@ -1,75 +1,161 @@
-
-from typing import List, Optional, Any
-
-
-###############################################################################
-# Stacks
-###############################################################################
-class Stack:
-    """A last-in-first-out (LIFO) stack of items.
-
-    Stores data in a last-in, first-out order. When removing an item from the
-    stack, the most recently-added item is the one that is removed.
-    """
-    # === Private Attributes ===
-    # _items:
-    #     The items stored in this stack. The end of the list represents
-    #     the top of the stack.
-    _items: List
-
-    def __init__(self) -> None:
-        """Initialize a new empty stack."""
-        self._items = []
-
-    def is_empty(self) -> bool:
-        return self._items == []
-
-    def push(self, item: Any) -> None:
-        """Add a new element to the top of this stack."""
-        self._items.append(item)
-
-    def pop(self) -> Any:
-        if self.is_empty():
-            raise EmptyStackError
-        else:
-            return self._items.pop()
-
-
-class EmptyStackError(Exception):
-    """Exception raised when calling pop on an empty stack."""
-
-    def __str__(self) -> str:
-        """Return a string representation of this error."""
-        return 'You called pop on an empty stack.'
-
-
-###############################################################################
-# Queues
-###############################################################################
-class Queue:
-    """A first-in-first-out (FIFO) queue of items.
-
-    Stores data in a first-in, first-out order. When removing an item from the
-    queue, the most recently-added item is the one that is removed.
-    """
-    # === Private attributes ===
-    # _items: a list of the items in this queue
-    _items: List
-
-    def __init__(self) -> None:
-        """Initialize a new empty queue."""
-        self._items = []
-
-    def is_empty(self) -> bool:
-        return self._items == []
-
-    def enqueue(self, item: Any) -> None:
-        """Add <item> to the back of this queue.
-        """
-        self._items.append(item)
-
-    def dequeue(self) -> Optional[Any]:
-        if self.is_empty():
-            return None
-        else:
-            return self._items.pop(0)
+import heapq
+from collections import deque
+from typing import Any, Deque, Iterable, List, Optional, Tuple
+
+
+###############################################################################
+# Stacks
+###############################################################################
+class Stack:
+    """A last-in-first-out (LIFO) stack of items.
+
+    Stores data in a last-in, first-out order. When removing an item from the
+    stack, the most recently-added item is the one that is removed.
+    """
+    # === Private Attributes ===
+    # _items:
+    #     The items stored in this stack. The right end of the deque
+    #     represents the top of the stack.
+    _items: Deque
+
+    def __init__(self) -> None:
+        """Initialize a new empty stack."""
+        self._items = deque()
+
+    def __len__(self) -> int:
+        """Return the number of items in this stack."""
+        return len(self._items)
+
+    def is_empty(self) -> bool:
+        return not self._items
+
+    def push(self, item: Any) -> None:
+        """Add a new element to the top of this stack."""
+        self._items.append(item)
+
+    def push_many(self, items: Iterable[Any]) -> None:
+        """Push each of <items> in turn, so the last one ends up on top."""
+        self._items.extend(items)
+
+    def pop(self) -> Any:
+        if not self._items:
+            raise EmptyStackError
+        else:
+            return self._items.pop()
+
+
+class EmptyStackError(Exception):
+    """Exception raised when calling pop on an empty stack."""
+
+    def __str__(self) -> str:
+        """Return a string representation of this error."""
+        return 'You called pop on an empty stack.'
+
+
+###############################################################################
+# Queues
+###############################################################################
+class Queue:
+    """A first-in-first-out (FIFO) queue of items.
+
+    Stores data in a first-in, first-out order. When removing an item from the
+    queue, the least recently-added item is the one that is removed.
+    """
+    # === Private attributes ===
+    # _items: the items in this queue, from front (left) to back (right);
+    #     a deque, so that both ends are updated in constant time
+    _items: Deque
+
+    def __init__(self) -> None:
+        """Initialize a new empty queue."""
+        self._items = deque()
+
+    def __len__(self) -> int:
+        """Return the number of items in this queue."""
+        return len(self._items)
+
+    def is_empty(self) -> bool:
+        return not self._items
+
+    def enqueue(self, item: Any) -> None:
+        """Add <item> to the back of this queue.
+        """
+        self._items.append(item)
+
+    def enqueue_many(self, items: Iterable[Any]) -> None:
+        """Add each of <items> to the back of this queue, in order.
+        """
+        self._items.extend(items)
+
+    def dequeue(self) -> Optional[Any]:
+        if not self._items:
+            return None
+        else:
+            return self._items.popleft()
+
+
+
+###############################################################################
+# Priority queues
+###############################################################################
+class PriorityQueue:
+    """A queue of items that are removed lowest priority first.
+
+    Items with equal priorities are removed in the order they were added.
+    Items themselves are never compared, so they need not be orderable.
+    """
+    # === Private attributes ===
+    # _heap: a binary heap of (priority, insertion number, item) entries
+    # _added: the number of items added so far, which breaks priority ties
+    _heap: List[Tuple[Any, int, Any]]
+    _added: int
+
+    def __init__(self) -> None:
+        """Initialize a new empty priority queue."""
+        self._heap = []
+        self._added = 0
+
+    def __len__(self) -> int:
+        """Return the number of items in this priority queue."""
+        return len(self._heap)
+
+    def is_empty(self) -> bool:
+        return not self._heap
+
+    def push(self, item: Any, priority: Any) -> None:
+        """Add <item> to this priority queue with <priority>."""
+        heapq.heappush(self._heap, (priority, self._added, item))
+        self._added += 1
+
+    def pop(self) -> Any:
+        """Remove and return the item with the lowest priority."""
+        if not self._heap:
+            raise EmptyPriorityQueueError
+        return heapq.heappop(self._heap)[2]
+
+
+class EmptyPriorityQueueError(Exception):
+    """Exception raised when calling pop on an empty priority queue."""
+
+    def __str__(self) -> str:
+        """Return a string representation of this error."""
+        return 'You called pop on an empty priority queue.'
+
+
+if __name__ == '__main__':
+    # Microbenchmark: a breadth first traversal that enqueues and dequeues
+    # n items should take time linear in n, i.e. a constant time per item.
+    import time
+
+    for n in (10 ** 4, 10 ** 5, 10 ** 6):
+        q = Queue()
+        start = time.perf_counter()
+        q.enqueue(0)
+        for i in range(1, n, 2):
+            q.dequeue()
+            q.enqueue_many((i, i + 1))
+        while not q.is_empty():
+            q.dequeue()
+        elapsed = time.perf_counter() - start
+        print('%8d items: %.3fs (%.0f ns per item)'
+              % (n, elapsed, elapsed / n * 1e9))
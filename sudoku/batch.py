@@ -0,0 +1,318 @@
+"""
+Solve a file of Sudoku puzzles, one per line, across a pool of processes.
+
+Each input line is a puzzle in the line-per-puzzle format of
+sudoku_puzzle.from_line (81, 256 or 625 characters for 9x9, 16x16 and 25x25
+puzzles); blank lines and lines starting with '#' are skipped. Puzzles are
+read, solved and written a chunk at a time, so the input is never held in
+memory as a whole.
+
+With the default ordered output, line i of the output is the solution of
+the i-th puzzle, or an empty line if it has none (or can't be read). With
+--unordered, solutions are written as soon as they are ready, each as the
+input line number and the solution separated by a tab.
+
+With --dedup, a puzzle that is equivalent under the Sudoku symmetries to an
+earlier one (see SudokuPuzzle.canonical_key) is not solved again. Its line
+is left out of the output, which is then numbered as with --unordered.
+Puzzles are first grouped by invariants that are cheap to compute as they
+are read: how many clues each symbol, and the rows and columns of each band
+and stack, have. Equivalent puzzles have the same invariants, so canonical
+keys are only computed, in the same pool as the solving, for puzzles whose
+group already has a puzzle. The invariants of every distinct puzzle, and
+the keys computed, are kept in memory.
+
+Example:
+    python batch.py puzzles.txt -o solutions.txt --workers 8 --chunksize 256
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import (FIRST_COMPLETED, Executor,
+                                ProcessPoolExecutor, as_completed, wait)
+from typing import (Any, Callable, Dict, Hashable, Iterable, Iterator, List,
+                    Optional, Tuple)
+
+from solver import BacktrackingSolver, DfsSolver, DlxSolver
+from sudoku_puzzle import (LINE_EMPTY, LINE_SYMBOLS, MinimumRemainingValues,
+                           from_line)
+
+SOLVERS = {'dlx': DlxSolver, 'backtracking': BacktrackingSolver,
+           'dfs': DfsSolver}
+
+
+def solve_line(line: str, solver: str = 'dlx',
+               symbols: Optional[str] = None) -> Optional[str]:
+    """
+    Return the solution of the puzzle in <line> in the same format, or None
+    if it has no solution or isn't a valid puzzle line.
+
+    <solver> names the solver to use, as in SOLVERS.
+    """
+    try:
+        puzzle = from_line(line, symbols, branching=MinimumRemainingValues(),
+                           propagate=True)
+    except (KeyError, ValueError):
+        return None
+    path = SOLVERS[solver]().solve(puzzle)
+    return path[-1].to_line() if path else None
+
+
+def stream_map(func: Callable[[Any], Any], items: Iterable[Any],
+               workers: int, ordered: bool = True,
+               backlog: int = 2, pool: Optional[Executor] = None
+               ) -> Iterator[Any]:
+    """
+    Yield func(item) for each of <items>, computed in a pool of <workers>
+    processes (or in this process if <workers> is 1). The pool is <pool> if
+    it is given, so that several streams can share one, or else a new one.
+
+    At most <backlog> items per worker are read ahead of the results, so
+    <items> can be a stream longer than fits in memory. If <ordered> is
+    False, results are yielded as soon as they are ready instead of in the
+    order of <items>.
+
+    <func> and each item must be picklable.
+    """
+    if pool is None:
+        if workers <= 1:
+            yield from map(func, items)
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                yield from stream_map(func, items, workers, ordered,
+                                      backlog, pool)
+        return
+
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(func, item))
+        while len(pending) >= workers * backlog:
+            if ordered:
+                yield pending.popleft().result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield future.result()
+    if ordered:
+        for future in pending:
+            yield future.result()
+    else:
+        for future in as_completed(pending):
+            yield future.result()
+
+
+def _solve_chunk(task: Tuple[List[Tuple[int, str]], str, Optional[str]]
+                 ) -> List[Tuple[int, Optional[str]]]:
+    # Return (line number, solution) for each numbered puzzle line in the
+    # chunk <task>, solved with the named solver and symbols.
+    lines, solver, symbols = task
+    return [(number, solve_line(line, solver, symbols))
+            for number, line in lines]
+
+
+def _invariant(line: str, symbols: Optional[str]) -> Optional[Hashable]:
+    # Return a value that equivalent puzzles share, read cheaply off the
+    # puzzle line <line> with the given symbols: the number of clues of each
+    # symbol, and of each row and column within its band and stack, up to
+    # the order of the symbols, rows, columns, bands and stacks and to
+    # transposing. Return None if <line> isn't a valid puzzle line.
+    line = line.strip()
+    n = round(len(line) ** (1 / 2))
+    if n * n != len(line) or (symbols is None and n not in LINE_SYMBOLS):
+        return None
+    symbols = symbols or LINE_SYMBOLS[n]
+    empty = ''.join(ch for ch in LINE_EMPTY if ch not in symbols)
+    counts = Counter(line)
+    for ch in empty:
+        counts.pop(ch, None)
+    if not set(counts) <= set(symbols):
+        return None
+    sqn = round(n ** (1 / 2))
+    clues = [[ch not in empty for ch in line[r * n:(r + 1) * n]]
+             for r in range(n)]
+    rows = [sum(row) for row in clues]
+    columns = [sum(column) for column in zip(*clues)]
+    bands, stacks = [tuple(sorted(tuple(sorted(units[b * sqn:(b + 1) * sqn]))
+                                  for b in range(sqn)))
+                     for units in (rows, columns)]
+    return n, tuple(sorted(counts.values())), tuple(sorted((bands, stacks)))
+
+
+def _key_chunk(task: Tuple[List[Tuple[int, str, Hashable, bool]],
+                           Optional[str]]
+               ) -> List[Tuple[int, str, Hashable, bool, Optional[bytes]]]:
+    # Return each item of the chunk <task>, a list of (line number, line,
+    # invariant, flag), with the canonical key of its line, read with the
+    # given symbols, added; the key is None for lines that aren't valid
+    # puzzles.
+    items, symbols = task
+    keyed = []
+    for number, line, invariant, flag in items:
+        try:
+            key = from_line(line, symbols).canonical_key()
+        except (KeyError, ValueError):
+            key = None
+        keyed.append((number, line, invariant, flag, key))
+    return keyed
+
+
+def _distinct_chunks(chunks: Iterable[List[Tuple[int, str]]], workers: int,
+                     chunksize: int, symbols: Optional[str],
+                     duplicates: List[int], pool: Optional[Executor] = None
+                     ) -> Iterator[List[Tuple[int, str]]]:
+    # Yield the puzzle lines of <chunks> that are not equivalent to an
+    # earlier one, in lists of up to <chunksize> lines, appending the line
+    # number of each one left out to <duplicates>. Keys are computed in
+    # <pool>, if it is given.
+    #
+    # groups maps each invariant seen to the keys of its distinct puzzles,
+    # and to the numbered line of its first puzzle until that one's key is
+    # asked for, which is when a second puzzle joins the group.
+    groups: Dict[Hashable, list] = {}
+    ready = deque()
+
+    def key_tasks() -> Iterator[Tuple[list, Optional[str]]]:
+        # Yield a task for each chunk to key the lines that need a key,
+        # each flagged True if it is to be solved unless it is a duplicate,
+        # putting the lines that need no key in ready.
+        for chunk in chunks:
+            items = []
+            for number, line in chunk:
+                invariant = _invariant(line, symbols)
+                group = groups.get(invariant)
+                if invariant is None or group is None:
+                    if invariant is not None:
+                        groups[invariant] = [(number, line), set()]
+                    ready.append((number, line))
+                    continue
+                if group[0] is not None:
+                    items.append(group[0] + (invariant, False))
+                    group[0] = None
+                items.append((number, line, invariant, True))
+            yield items, symbols
+
+    def distinct() -> Iterator[Tuple[int, str]]:
+        for keyed in stream_map(_key_chunk, key_tasks(), workers, pool=pool):
+            while ready:
+                yield ready.popleft()
+            for number, line, invariant, to_solve, key in keyed:
+                keys = groups[invariant][1]
+                if to_solve and key is not None and key in keys:
+                    duplicates.append(number)
+                    continue
+                keys.add(key)
+                if to_solve:
+                    yield number, line
+        while ready:
+            yield ready.popleft()
+
+    lines = distinct()
+    while True:
+        chunk = list(itertools.islice(lines, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _read_chunks(lines: Iterable[str], chunksize: int
+                 ) -> Iterator[List[Tuple[int, str]]]:
+    # Yield the puzzle lines of <lines>, numbered from 1, in lists of up to
+    # <chunksize> lines.
+    numbered = ((number, line.strip())
+                for number, line in enumerate(lines, 1))
+    puzzles = ((number, line) for number, line in numbered
+               if line and not line.startswith('#'))
+    while True:
+        chunk = list(itertools.islice(puzzles, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def solve_file(lines: Iterable[str], out, workers: int, chunksize: int,
+               ordered: bool = True, solver: str = 'dlx',
+               symbols: Optional[str] = None,
+               dedup: bool = False) -> Tuple[int, int, int]:
+    """
+    Solve the puzzles in <lines>, writing the solutions to the text stream
+    <out> as described at the top of this module, and return the number of
+    puzzles solved, the number of them that have no solution, and the
+    number of puzzles left out as equivalent to an earlier one if <dedup>
+    is True.
+    """
+    chunks = _read_chunks(lines, chunksize)
+    duplicates = []
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        if dedup:
+            chunks = _distinct_chunks(chunks, workers, chunksize, symbols,
+                                      duplicates, pool)
+        tasks = ((chunk, solver, symbols) for chunk in chunks)
+        total = unsolved = 0
+        for results in stream_map(_solve_chunk, tasks, workers, ordered,
+                                  pool=pool):
+            for number, solution in results:
+                total += 1
+                if solution is None:
+                    unsolved += 1
+                if ordered and not dedup:
+                    out.write((solution or '') + '\n')
+                else:
+                    out.write('%d\t%s\n' % (number, solution or ''))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return total, unsolved, len(duplicates)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description='Solve a file of Sudoku puzzles, one per line.')
+    parser.add_argument('input', help="puzzle file, or '-' for stdin")
+    parser.add_argument('-o', '--output', default='-',
+                        help="solution file, or '-' for stdout (default)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='number of processes (default: one per core)')
+    parser.add_argument('--chunksize', type=int, default=64,
+                        help='puzzles sent to a process at a time')
+    parser.add_argument('--unordered', action='store_true',
+                        help='write solutions as soon as they are ready')
+    parser.add_argument('--dedup', action='store_true',
+                        help='solve puzzles equivalent under the Sudoku '
+                             'symmetries only once')
+    parser.add_argument('--solver', choices=sorted(SOLVERS), default='dlx')
+    parser.add_argument('--symbols', default=None,
+                        help='the symbols of the puzzles, if not the '
+                             'defaults for their size')
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == '-' else open(args.input)
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    start = time.perf_counter()
+    try:
+        total, unsolved, duplicates = solve_file(
+            source, out, args.workers, args.chunksize, not args.unordered,
+            args.solver, args.symbols, args.dedup)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    # puzzles left out as duplicates were dealt with too
+    read = total + duplicates
+    print('%d puzzles (%d unsolved) in %.2fs: %.1f puzzles/s'
+          % (read, unsolved, elapsed, read / elapsed if elapsed else 0.0),
+          file=sys.stderr)
+    if args.dedup:
+        print('%d equivalent puzzles left out' % duplicates, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+"""
+Benchmark the puzzle solvers on graded corpora of Sudoku puzzles.
+
+For each solver and corpus this measures the wall time, the nodes expanded
+(Solver.nodes_expanded), the states expanded per second and the peak memory
+allocated while solving, and writes the results as JSON. The built-in
+corpora are easy, hard and 17-clue 9x9 puzzles, plus 16x16 and 25x25
+puzzles made from a seeded shuffle of a pattern grid; other corpora can be
+read from line-per-puzzle files (see sudoku_puzzle.from_line).
+
+Each puzzle is timed --repeat times and the fastest run is kept, to damp
+timing noise. Peak memory is measured with tracemalloc in a separate,
+untimed pass, so it doesn't slow down the timed ones.
+
+Pass --compare with the JSON of an earlier run to list the cases that got
+slower (or expanded more nodes) by more than --tolerance; the exit status
+is then 1 if there are any.
+
+Example:
+    python benchmark.py --solvers dlx,backtracking -o run.json
+    python benchmark.py --compare run.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from generate import remove_clues
+from solver import (BacktrackingSolver, BfsSolver, DfsSolver, DlxSolver,
+                    Solver)
+from sudoku_puzzle import (LINE_SYMBOLS, FirstEmptyCell,
+                           MinimumRemainingValues, SudokuPuzzle, from_line)
+
+# Each solver to benchmark, by name. Add new backends here.
+SOLVERS: Dict[str, Callable[[], Solver]] = {
+    'dfs': DfsSolver,
+    'bfs': BfsSolver,
+    'backtracking': BacktrackingSolver,
+    'dlx': DlxSolver,
+}
+
+EASY = [
+    '...9.2....91...63..3..7..8.3.......8..9...2..5.......7.7..8..4..45...81'
+    '....3.6...',
+]
+HARD = [
+    # Arto Inkala's 2010 puzzle, "AI Escargot" and "Easter Monster"
+    '8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1'
+    '..9....4..',
+    '1....7.9..3..2...8..96..5....53..9...1..8...26....4...3......1..4......7'
+    '..7...3..',
+    '1.......2.9.4...5...6...7...5.9.3.......7.......85..4.7.....6...3...9.8'
+    '...2.....1',
+]
+SEVENTEEN = [
+    '000000010400000000020000000000050407008000300001090000300400200050100000'
+    '000806000',
+    '000000010400000000020000000000050604008000300001090000300400200050100000'
+    '000807000',
+    '000000012000035000000600070700000300000400800100000000000120000080000040'
+    '050000600',
+    '000000012003600000000007000410020000000500300700000600280000040000300500'
+    '000000000',
+    '000000012008030000000000040120500000000004700060000000507000300000620000'
+    '000100000',
+    '000000012040050000000009000070600400000100000000000050000087500601000300'
+    '200000000',
+    '000000012050400000000000030700600400001000000000080000920000800000510700'
+    '000003000',
+]
+
+
+def pattern_puzzles(n: int, count: int, holes: float,
+                    seed: int = 0) -> List[str]:
+    """
+    Return <count> n x n puzzle lines, each made by shuffling the rows,
+    columns and symbols of a pattern grid and then emptying a fraction
+    <holes> of its positions, using a random generator seeded with <seed>.
+    The puzzles are solvable but need not have unique solutions.
+    """
+    rng = random.Random(seed)
+    sqn = round(n ** (1 / 2))
+    symbols = LINE_SYMBOLS[n]
+    lines = []
+    for _ in range(count):
+        def order() -> List[int]:
+            bands = rng.sample(range(sqn), sqn)
+            return [b * sqn + i for b in bands
+                    for i in rng.sample(range(sqn), sqn)]
+        rows, cols = order(), order()
+        relabel = rng.sample(symbols, n)
+        cells = [relabel[(sqn * (r % sqn) + r // sqn + c) % n]
+                 for r in rows for c in cols]
+        for i in rng.sample(range(n * n), round(holes * n * n)):
+            cells[i] = '.'
+        lines.append(''.join(cells))
+    return lines
+
+
+def _easy_from(lines: List[str], clues: int, seed: int = 0) -> List[str]:
+    # Return the solutions of <lines> with all but <clues> positions
+    # emptied again, chosen with a random generator seeded with <seed>, and
+    # only while the solution stays unique (see generate.remove_clues), so
+    # every solver finds the same solution.
+    rng = random.Random(seed)
+    return [remove_clues(DlxSolver().solve(from_line(line))[-1].to_line(),
+                         rng, clues)
+            for line in lines]
+
+
+def corpora() -> Dict[str, List[str]]:
+    """
+    Return the built-in corpora, by name.
+    """
+    return {
+        'easy-9': EASY + _easy_from(SEVENTEEN, 40),
+        'hard-9': HARD,
+        '17-clue-9': SEVENTEEN,
+        '16': pattern_puzzles(16, 5, 0.55, seed=16),
+        '25': pattern_puzzles(25, 3, 0.45, seed=25),
+    }
+
+
+def run_case(make_solver: Callable[[], Solver], puzzles: List[SudokuPuzzle],
+             memory: bool = True, repeat: int = 3) -> Dict[str, float]:
+    """
+    Solve each of <puzzles> <repeat> times with a new solver from
+    <make_solver> and return the measurements, as described at the top of
+    this module.
+    """
+    wall, nodes, solved = 0.0, 0, 0
+    for puzzle in puzzles:
+        best = None
+        for _ in range(repeat):
+            solver = make_solver()
+            start = time.perf_counter()
+            path = solver.solve(puzzle)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        wall += best
+        nodes += solver.nodes_expanded
+        solved += bool(path)
+
+    peak = None
+    if memory:
+        peak = 0
+        for puzzle in puzzles:
+            tracemalloc.start()
+            make_solver().solve(puzzle)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+    return {'puzzles': len(puzzles), 'solved': solved,
+            'wall_time': wall, 'mean_time': wall / len(puzzles),
+            'nodes_expanded': nodes,
+            'states_per_sec': nodes / wall if wall else 0.0,
+            'peak_memory': peak}
+
+
+def compare(results: List[Dict], baseline: List[Dict],
+            tolerance: float) -> List[str]:
+    """
+    Return a description of each case in <results> whose wall time or
+    nodes expanded is more than <tolerance> (a fraction) above the same case
+    in <baseline>.
+    """
+    before = {(r['solver'], r['corpus'], r['options']): r for r in baseline}
+    regressions = []
+    for result in results:
+        old = before.get((result['solver'], result['corpus'],
+                          result['options']))
+        if old is None:
+            continue
+        for measure in ('wall_time', 'nodes_expanded'):
+            if result[measure] > old[measure] * (1 + tolerance):
+                regressions.append(
+                    '%s on %s (%s): %s %.4g -> %.4g'
+                    % (result['solver'], result['corpus'], result['options'],
+                       measure, old[measure], result[measure]))
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    builtin = corpora()
+    parser = argparse.ArgumentParser(
+        description='Benchmark the Sudoku solvers.')
+    parser.add_argument('--solvers', default=','.join(SOLVERS),
+                        help='comma-separated solvers to run (default: all)')
+    parser.add_argument('--corpora', default=','.join(builtin),
+                        help='comma-separated built-in corpora to run '
+                             '(default: all)')
+    parser.add_argument('--corpus', action='append', default=[],
+                        metavar='NAME=FILE',
+                        help='add a corpus read from a puzzle file')
+    parser.add_argument('--branching', choices=['first', 'mrv'],
+                        default='mrv')
+    parser.add_argument('--no-propagate', action='store_true',
+                        help='turn off singles propagation')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='timed runs per puzzle, keeping the fastest')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip the peak memory pass')
+    parser.add_argument('-o', '--output', default='-',
+                        help="JSON file to write, or '-' for stdout")
+    parser.add_argument('--compare', metavar='JSON',
+                        help='JSON of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed slowdown before a case counts as a '
+                             'regression (default: 0.2)')
+    args = parser.parse_args(argv)
+
+    selected = {name: builtin[name] for name in args.corpora.split(',')
+                if name}
+    for spec in args.corpus:
+        name, path = spec.split('=', 1)
+        with open(path) as f:
+            selected[name] = [line.strip() for line in f
+                              if line.strip() and not line.startswith('#')]
+
+    options = {'branching': args.branching,
+               'propagate': not args.no_propagate}
+    strategy = (MinimumRemainingValues() if args.branching == 'mrv'
+                else FirstEmptyCell())
+    label = '%s%s' % (args.branching,
+                      '+propagate' if options['propagate'] else '')
+
+    results = []
+    for solver in args.solvers.split(','):
+        for corpus, lines in selected.items():
+            puzzles = [from_line(line, branching=strategy,
+                                 propagate=options['propagate'])
+                       for line in lines]
+            result = {'solver': solver, 'corpus': corpus, 'options': label}
+            result.update(run_case(SOLVERS[solver], puzzles,
+                                   not args.no_memory, args.repeat))
+            results.append(result)
+            print('%-13s %-10s %8.4fs %9d nodes %10.0f states/s'
+                  % (solver, corpus, result['wall_time'],
+                     result['nodes_expanded'], result['states_per_sec']),
+                  file=sys.stderr)
+
+    report = {'python': platform.python_version(),
+              'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'options': options, 'results': results}
+    text = json.dumps(report, indent=2)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f)['results'],
+                                  args.tolerance)
+        for regression in regressions:
+            print('regression: ' + regression, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
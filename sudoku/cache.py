@@ -0,0 +1,121 @@
+from __future__ import annotations
+import os
+import pickle
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Union
+
+from puzzle import Puzzle
+
+# The entry of a state that is known to have no solution; False rather than
+# a new object, so that it is still the same object after a save and load
+DEAD = False
+
+
+class TranspositionCache:
+    """
+    A bounded cache of what is known about puzzle states, keyed by their
+    state keys (see Puzzle.state_key), that solvers given the cache consult
+    before expanding a state (see Solver.__init__). One cache can be shared
+    by the solvers of many puzzles, so states that related puzzles have in
+    common are only explored once.
+
+    A state is known to be dead if no solution can be reached from it, or
+    known to be solvable if the next state on the way to a solution is
+    known. When more than <max_entries> states are known, the state used
+    least recently is forgotten.
+
+    If <path> is given, the cache starts with the entries saved there (if
+    the file exists), and save writes its entries back.
+
+    === Public Attributes ===
+    max_entries: the largest number of states to keep entries for
+    path: the file the entries are loaded from and saved to, or None
+    hits: the number of lookups that found an entry
+
+    === Private Attributes ===
+    _entries: maps each state key to DEAD or to the next state on a path to
+      a solution, least recently used first
+    """
+    max_entries: int
+    path: Optional[str]
+    hits: int
+    _entries: OrderedDict
+
+    def __init__(self, max_entries: int = 100000,
+                 path: Optional[str] = None) -> None:
+        """Initialize a new cache, loading the entries saved at <path>."""
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self._entries = OrderedDict()
+        if path is not None and os.path.exists(path):
+            with open(path, 'rb') as f:
+                self._entries = pickle.load(f)
+            self._trim()
+
+    def __len__(self) -> int:
+        """Return the number of states this cache has entries for."""
+        return len(self._entries)
+
+    def lookup(self, key: Hashable) -> Optional[Union[bool, Puzzle]]:
+        """
+        Return DEAD if the state with <key> is known to be dead, the next
+        state on a path to a solution if it is known to be solvable, or
+        None if nothing is known about it.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return entry
+
+    def is_dead(self, key: Hashable) -> bool:
+        """Return True if the state with <key> is known to be dead."""
+        return self.lookup(key) is DEAD
+
+    def path_from(self, puzzle: Puzzle) -> Optional[List[Puzzle]]:
+        """
+        Return a path from <puzzle> to a solution made of known solvable
+        states, or None if there is no such path in this cache.
+        """
+        path = [puzzle]
+        while not path[-1].is_solved():
+            entry = self.lookup(path[-1].state_key())
+            # a path longer than the cache has gone round a cycle
+            if entry is None or entry is DEAD or len(path) > len(self):
+                return None
+            path.append(entry)
+        return path
+
+    def add_dead(self, key: Hashable) -> None:
+        """Record that the state with <key> is dead."""
+        self._entries[key] = DEAD
+        self._entries.move_to_end(key)
+        self._trim()
+
+    def add_path(self, path: List[Puzzle]) -> None:
+        """
+        Record that each state on <path>, a path that ends with a solved
+        state, is solvable by way of the next state on it.
+        """
+        for state, next_state in zip(path, path[1:]):
+            key = state.state_key()
+            self._entries[key] = next_state
+            self._entries.move_to_end(key)
+        self._trim()
+
+    def save(self) -> None:
+        """
+        Write the entries of this cache to its path.
+
+        Raise ValueError if this cache has no path.
+        """
+        if self.path is None:
+            raise ValueError('this cache was made without a path to save to')
+        with open(self.path, 'wb') as f:
+            pickle.dump(self._entries, f, pickle.HIGHEST_PROTOCOL)
+
+    def _trim(self) -> None:
+        """Forget the least recently used entries beyond max_entries."""
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,247 @@
+from __future__ import annotations
+from typing import Dict, Hashable, Iterator, List, Optional
+
+
+class ExactCover:
+    """
+    An exact cover problem: choose a set of rows that together contain each
+    column exactly once. Solved with Knuth's Algorithm X on dancing links.
+
+    The matrix is kept as circular doubly linked lists stored in parallel
+    arrays, one entry per node. Node 0 is the root, nodes 1 to m are the
+    column headers, and the remaining nodes are the 1s of the matrix.
+
+    === Public Attributes ===
+    nodes: the number of search nodes (column choices) made so far
+
+    === Private Attributes ===
+    _left, _right: the horizontal links of each node
+    _up, _down: the vertical links of each node
+    _col: the column header of each node
+    _row: the index of the matrix row of each node (-1 for headers)
+    _first: the first node of each matrix row, by row index
+    _size: the number of 1s still linked into each column, by header
+    """
+    nodes: int
+    _left: List[int]
+    _right: List[int]
+    _up: List[int]
+    _down: List[int]
+    _col: List[int]
+    _row: List[int]
+    _first: List[int]
+    _size: List[int]
+
+    def __init__(self, columns: List[Hashable],
+                 rows: List[List[Hashable]]) -> None:
+        """
+        Create the exact cover problem whose columns are <columns> and whose
+        i-th row contains exactly the columns in rows[i].
+
+        Preconditions:
+        - <columns> has no duplicates
+        - each column in each row of <rows> is in <columns>
+        """
+        m = len(columns)
+        header: Dict[Hashable, int] = {c: i + 1 for i, c in enumerate(columns)}
+        self.nodes = 0
+        self._left = [m] + list(range(m))
+        self._right = list(range(1, m + 1)) + [0]
+        self._up = list(range(m + 1))
+        self._down = list(range(m + 1))
+        self._col = list(range(m + 1))
+        self._row = [-1] * (m + 1)
+        self._size = [0] * (m + 1)
+        self._first = []
+
+        left, right, up, down = self._left, self._right, self._up, self._down
+        for i, row in enumerate(rows):
+            first = len(self._col)
+            self._first.append(first)
+            for column in row:
+                c = header[column]
+                node = len(self._col)
+                self._col.append(c)
+                self._row.append(i)
+                # link at the bottom of column c
+                up.append(up[c])
+                down.append(c)
+                down[up[c]] = node
+                up[c] = node
+                self._size[c] += 1
+                # link at the end of this row
+                left.append(node - 1 if node > first else node)
+                right.append(first)
+                if node > first:
+                    right[node - 1] = node
+                    left[first] = node
+
+    def solutions(self, limit: Optional[int] = None) -> Iterator[List[int]]:
+        """
+        Yield each solution of this problem as a list of row indices, up to
+        <limit> solutions if it is not None.
+
+        The links are restored once the generator is exhausted.
+        """
+        if limit is not None and limit <= 0:
+            return
+        right, down, col, size = self._right, self._down, self._col, self._size
+        # chosen[i] is the node of the row chosen at depth i
+        chosen: List[int] = []
+        found = 0
+
+        while True:
+            if right[0] == 0:
+                yield [self._row[node] for node in chosen]
+                found += 1
+                if limit is not None and found >= limit:
+                    self._restore(chosen)
+                    return
+            else:
+                # choose the column with the fewest 1s left
+                c, j = right[0], right[right[0]]
+                while j != 0 and size[c] > 1:
+                    if size[j] < size[c]:
+                        c = j
+                    j = right[j]
+                self.nodes += 1
+                if size[c]:
+                    self._cover(c)
+                    node = down[c]
+                    chosen.append(node)
+                    self._cover_row(node)
+                    continue
+
+            # backtrack to the deepest row that has an untried alternative
+            while chosen:
+                node = chosen.pop()
+                self._uncover_row(node)
+                c = col[node]
+                node = down[node]
+                if node != c:
+                    chosen.append(node)
+                    self._cover_row(node)
+                    break
+                self._uncover(c)
+            else:
+                return
+
+    def count(self, limit: Optional[int] = None) -> int:
+        """
+        Return the number of solutions of this problem, counting no further
+        than <limit> if it is not None.
+        """
+        return sum(1 for _ in self.solutions(limit))
+
+    def select(self, i: int) -> None:
+        """
+        Put row <i> in every solution of this problem, until deselect(<i>).
+
+        Rows are selected, deselected, excluded and included like a stack:
+        each call to deselect or include undoes the latest select or exclude
+        not yet undone.
+
+        Precondition: none of the columns of row <i> is covered by a row
+        already selected.
+        """
+        node = self._first[i]
+        self._cover(self._col[node])
+        self._cover_row(node)
+
+    def deselect(self, i: int) -> None:
+        """
+        Undo select(<i>).
+        """
+        node = self._first[i]
+        self._uncover_row(node)
+        self._uncover(self._col[node])
+
+    def exclude(self, i: int) -> None:
+        """
+        Leave row <i> out of every solution of this problem, until
+        include(<i>).
+
+        Precondition: none of the columns of row <i> is covered by a row
+        already selected.
+        """
+        up, down, col, size = self._up, self._down, self._col, self._size
+        node = self._first[i]
+        j = node
+        while True:
+            down[up[j]] = down[j]
+            up[down[j]] = up[j]
+            size[col[j]] -= 1
+            j = self._right[j]
+            if j == node:
+                return
+
+    def include(self, i: int) -> None:
+        """
+        Undo exclude(<i>).
+        """
+        up, down, col, size = self._up, self._down, self._col, self._size
+        node = self._left[self._first[i]]
+        j = node
+        while True:
+            size[col[j]] += 1
+            down[up[j]] = j
+            up[down[j]] = j
+            j = self._left[j]
+            if j == node:
+                return
+
+    def _restore(self, chosen: List[int]) -> None:
+        # Undo the covering done for the rows in <chosen>.
+        while chosen:
+            node = chosen.pop()
+            self._uncover_row(node)
+            self._uncover(self._col[node])
+
+    def _cover_row(self, node: int) -> None:
+        # Cover every other column of the row containing <node>.
+        right, col = self._right, self._col
+        j = right[node]
+        while j != node:
+            self._cover(col[j])
+            j = right[j]
+
+    def _uncover_row(self, node: int) -> None:
+        # Undo _cover_row(<node>), in reverse order.
+        left, col = self._left, self._col
+        j = left[node]
+        while j != node:
+            self._uncover(col[j])
+            j = left[j]
+
+    def _cover(self, c: int) -> None:
+        # Unlink column c, and every row that has a 1 in it from the other
+        # columns of that row.
+        left, right, up, down = self._left, self._right, self._up, self._down
+        col, size = self._col, self._size
+        right[left[c]] = right[c]
+        left[right[c]] = left[c]
+        i = down[c]
+        while i != c:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                size[col[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def _uncover(self, c: int) -> None:
+        # Undo _cover(c), relinking in the reverse order.
+        left, right, up, down = self._left, self._right, self._up, self._down
+        col, size = self._col, self._size
+        i = up[c]
+        while i != c:
+            j = left[i]
+            while j != i:
+                size[col[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[c]] = c
+        left[right[c]] = c
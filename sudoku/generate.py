@@ -0,0 +1,209 @@
+"""
+Generate Sudoku puzzles with unique solutions, across a pool of processes.
+
+Each puzzle starts as a random full grid, found by Algorithm X (see
+dlx.ExactCover) on the empty grid with its candidate moves shuffled. Clues
+are then removed one at a time in a random order, keeping each removal only
+if the puzzle still has a unique solution. The grid's solution is known,
+so a removal keeps the solution unique exactly when no solution puts
+another symbol at the emptied position; that is a single early-exit search
+for any solution, rather than a count of two. Every search runs on one
+exact cover problem for the puzzle, built once, with the clues' rows
+selected and the emptied position's move excluded. The grid's own moves
+come first in each column, so the search tries the grid first and another
+solution, which mostly agrees with it, is found quickly.
+
+A puzzle's difficulty is the number of states a BacktrackingSolver expands
+to solve it, with the most constrained position branched on and singles
+propagated: 1 for puzzles that singles alone solve, more for puzzles that
+need guessing. Puzzles outside --difficulty are thrown away and generated
+again.
+
+Puzzles are written one per line in the line-per-puzzle format of
+sudoku_puzzle.from_line, as soon as they are ready. Each chunk of puzzles is
+generated from its own seed, so a run with the same --seed and --chunksize
+generates the same puzzles, though not in the same order.
+
+Example:
+    python generate.py --count 100000 -o puzzles.txt --min-clues 24 \
+        --difficulty 2 1000
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Iterator, List, Optional, Tuple
+
+from batch import stream_map
+from dlx import ExactCover
+from solver import BacktrackingSolver
+from sudoku_puzzle import LINE_SYMBOLS, MinimumRemainingValues, from_line
+
+
+def full_grid(n: int, rng: random.Random) -> str:
+    """
+    Return a random full n x n grid in the line-per-puzzle format, using the
+    random generator <rng>.
+    """
+    puzzle = from_line('.' * (n * n))
+    columns, moves, rows = puzzle.exact_cover()
+    order = list(range(len(moves)))
+    rng.shuffle(order)
+    problem = ExactCover(columns, [rows[i] for i in order])
+    cells = ['.'] * (n * n)
+    for solution in problem.solutions(1):
+        for i in solution:
+            r, c, symbol = moves[order[i]]
+            cells[r * n + c] = symbol
+    return ''.join(cells)
+
+
+def remove_clues(grid: str, rng: random.Random, min_clues: int = 0) -> str:
+    """
+    Return a puzzle whose unique solution is the full grid <grid>, made by
+    emptying its positions in a random order chosen with <rng>, skipping
+    those whose removal would allow another solution, until no more can be
+    removed or only <min_clues> clues are left.
+    """
+    n = round(len(grid) ** (1 / 2))
+    cells = list(grid)
+    clues = n * n
+    positions = list(range(n * n))
+    rng.shuffle(positions)
+    # The exact cover problem of the empty grid, built once, whose row p is
+    # the move of <grid> at position p and whose other rows follow. Every
+    # position's row is selected, the next position to try on top. Trying a
+    # position takes its row off the top, selects the rows of the clues kept
+    # so far and excludes the position's row, so any solution has another
+    # symbol there.
+    columns, moves, rows = from_line('.' * (n * n)).exact_cover()
+    index = {move: i for i, move in enumerate(moves)}
+    solution = [index[(p // n, p % n, grid[p])] for p in range(n * n)]
+    others = sorted(set(range(len(rows))) - set(solution))
+    problem = ExactCover(columns, [rows[i] for i in solution + others])
+    for p in reversed(positions):
+        problem.select(p)
+    kept: List[int] = []
+    for p in positions:
+        if clues <= min_clues:
+            break
+        problem.deselect(p)
+        for q in kept:
+            problem.select(q)
+        problem.exclude(p)
+        other = problem.count(1) > 0
+        problem.include(p)
+        for q in reversed(kept):
+            problem.deselect(q)
+        if other:
+            kept.append(p)
+        else:
+            cells[p] = '.'
+            clues -= 1
+    return ''.join(cells)
+
+
+def difficulty(line: str) -> int:
+    """
+    Return the difficulty of the puzzle <line>, as described at the top of
+    this module.
+    """
+    puzzle = from_line(line, branching=MinimumRemainingValues(),
+                       propagate=True)
+    solver = BacktrackingSolver()
+    solver.solve(puzzle)
+    return solver.nodes_expanded
+
+
+def generate(n: int, rng: random.Random, min_clues: int = 0,
+             band: Optional[Tuple[int, int]] = None,
+             attempts: int = 100) -> Optional[str]:
+    """
+    Return a random n x n puzzle with a unique solution, generated with
+    <rng>, that has at least <min_clues> clues and whose difficulty lies in
+    the inclusive range <band> if it is not None. Return None if no such
+    puzzle was found in <attempts> attempts.
+    """
+    for _ in range(attempts):
+        puzzle = remove_clues(full_grid(n, rng), rng, min_clues)
+        if band is None or band[0] <= difficulty(puzzle) <= band[1]:
+            return puzzle
+    return None
+
+
+def _generate_chunk(task: Tuple[int, int, int, int,
+                                Optional[Tuple[int, int]]]) -> List[str]:
+    # Return up to <count> puzzles for the task (seed, count, n, min_clues,
+    # band), leaving out the attempts that found no puzzle in the band.
+    seed, count, n, min_clues, band = task
+    rng = random.Random(seed)
+    puzzles = (generate(n, rng, min_clues, band) for _ in range(count))
+    return [puzzle for puzzle in puzzles if puzzle is not None]
+
+
+def generate_file(out, count: int, n: int, workers: int, chunksize: int,
+                  seed: int = 0, min_clues: int = 0,
+                  band: Optional[Tuple[int, int]] = None) -> int:
+    """
+    Write <count> generated n x n puzzles to the text stream <out>, as
+    described at the top of this module, and return the number written.
+    Fewer than <count> are written only if some chunk gave up on finding
+    puzzles in <band>.
+    """
+    def tasks() -> Iterator[Tuple[int, int, int, int,
+                                  Optional[Tuple[int, int]]]]:
+        for i, start in enumerate(range(0, count, chunksize)):
+            yield (seed * 1000003 + i, min(chunksize, count - start), n,
+                   min_clues, band)
+
+    written = 0
+    for puzzles in stream_map(_generate_chunk, tasks(), workers,
+                              ordered=False):
+        for puzzle in puzzles:
+            out.write(puzzle + '\n')
+        written += len(puzzles)
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description='Generate Sudoku puzzles with unique solutions.')
+    parser.add_argument('--count', type=int, default=100,
+                        help='number of puzzles to generate')
+    parser.add_argument('--size', type=int, choices=sorted(LINE_SYMBOLS),
+                        default=9, help='rows/columns of each puzzle')
+    parser.add_argument('-o', '--output', default='-',
+                        help="puzzle file, or '-' for stdout (default)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='number of processes (default: one per core)')
+    parser.add_argument('--chunksize', type=int, default=16,
+                        help='puzzles generated by a process at a time')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--min-clues', type=int, default=0,
+                        help='stop removing clues at this many')
+    parser.add_argument('--difficulty', type=int, nargs=2, default=None,
+                        metavar=('LOW', 'HIGH'),
+                        help='keep only puzzles whose difficulty is in '
+                             'this inclusive range')
+    args = parser.parse_args(argv)
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    start = time.perf_counter()
+    try:
+        written = generate_file(out, args.count, args.size, args.workers,
+                                args.chunksize, args.seed, args.min_clues,
+                                args.difficulty and tuple(args.difficulty))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print('%d puzzles in %.2fs: %.1f puzzles/s'
+          % (written, elapsed, written / elapsed if elapsed else 0.0),
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
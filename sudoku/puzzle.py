@@ -1,5 +1,6 @@
 from __future__ import annotations
-from typing import List
+import copy
+from typing import Any, Hashable, List
 
 
 class Puzzle:
@@ -39,3 +40,60 @@ class Puzzle:
         in a subclass.
         """
         raise NotImplementedError
+
+    # The methods below let a solver work on a single Puzzle in place instead
+    # of creating a new Puzzle for every state (see BacktrackingSolver).
+    # They only need to be implemented by puzzles used with such solvers.
+    def moves(self) -> List[Any]:
+        """
+        Return a list of the moves that can be made on this Puzzle, in the
+        same order as the extensions they lead to in self.extensions().
+
+        This is an abstract method that must be implemented in a subclass
+        used with a solver that works in place.
+        """
+        raise NotImplementedError
+
+    def apply_move(self, move: Any) -> Any:
+        """
+        Make <move> on this Puzzle, changing it in place, and return a
+        record of the change that undo_move accepts.
+
+        This is an abstract method that must be implemented in a subclass
+        used with a solver that works in place.
+        """
+        raise NotImplementedError
+
+    def undo_move(self, record: Any) -> None:
+        """
+        Undo the change described by <record>, which was returned by the
+        most recent apply_move on this Puzzle that is not yet undone.
+
+        This is an abstract method that must be implemented in a subclass
+        used with a solver that works in place.
+        """
+        raise NotImplementedError
+
+    def extend(self, move: Any) -> Puzzle:
+        """
+        Return a new Puzzle that is this Puzzle after <move>, leaving this
+        Puzzle unchanged.
+
+        Override this in a subclass where a new state can be made more
+        cheaply than by copying the whole Puzzle.
+        """
+        new_puzzle = copy.deepcopy(self)
+        new_puzzle.apply_move(move)
+        return new_puzzle
+
+    def state_key(self) -> Hashable:
+        """
+        Return a compact, hashable key that identifies the state of this
+        Puzzle: two states of the same puzzle have equal keys exactly when
+        they are equal.
+
+        Solvers use these keys to remember which states they have seen.
+        The default is str(self); override this in a subclass where a
+        cheaper encoding is available.
+        """
+        return str(self)
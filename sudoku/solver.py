@@ -1,18 +1,56 @@
 from __future__ import annotations
 
-from typing import List, Optional, Set
+import copy
+import itertools
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from typing import (Any, Callable, Dict, Hashable, Iterator, List, Optional,
+                    Set, Tuple)
 
 # You may remove this import if you don't use it in your code.
-from adts import Queue
+from adts import PriorityQueue, Queue, Stack
 
+from cache import DEAD, TranspositionCache
+from dlx import ExactCover
 from puzzle import Puzzle
+from stats import SearchStats
 
 
 class Solver:
     """"
     A solver for full-information puzzles. This is an abstract class
     and purely provides the interface for our solve method.
+
+    === Public Attributes ===
+    nodes_expanded: the number of puzzle states expanded (that is, whose
+      extensions or moves were generated) by the most recent call to solve
+    stats: the SearchStats that searches are instrumented with, or None if
+      they are not
+    cache: the TranspositionCache that searches consult and add to, or None
+      if they do not
     """
+    nodes_expanded: int
+    stats: Optional[SearchStats]
+    cache: Optional[TranspositionCache]
+
+    def __init__(self, stats: Optional[SearchStats] = None,
+                 cache: Optional[TranspositionCache] = None) -> None:
+        """
+        Initialize a new solver, which collects counters and timings of its
+        searches in <stats> if it is not None. Without stats, the search
+        loops do no extra work beyond a few None checks.
+
+        If <cache> is not None, states it knows to be dead are not expanded,
+        and what searches find out is added to it; DfsSolver and BfsSolver
+        also follow the known paths to a solution it holds. The cache is
+        only used by searches without seen states, as a state excluded by
+        seen may be all that keeps another state from a solution.
+        """
+        self.nodes_expanded = 0
+        self.stats = stats
+        self.cache = cache
 
     # You may NOT change the interface to the solve method.
     # Note the optional parameter seen and its type.
@@ -20,9 +58,153 @@ class Solver:
     # to keep track of all puzzle states that you encounter during the
     # solution process.
     def solve(self, puzzle: Puzzle,
-              seen: Optional[Set[str]] = None) -> List[Puzzle]:
+              seen: Optional[Set[Hashable]] = None) -> List[Puzzle]:
         raise NotImplementedError
 
+    def count_solutions(self, puzzle: Puzzle,
+                        limit: Optional[int] = None) -> int:
+        """
+        Return the number of distinct solved states that can be reached from
+        <puzzle>, in a single search that stops as soon as <limit> of them
+        are found if <limit> is not None.
+        """
+        raise NotImplementedError
+
+    def _search(self, puzzle: Puzzle, seen: Optional[Set[Hashable]],
+                frontier: Any, push: Callable[[Puzzle], None],
+                pop: Callable[[], Puzzle]) -> List[Puzzle]:
+        """
+        Return a path from <puzzle> to a solution, or [] if there is none,
+        visiting states in the order given by the empty container <frontier>
+        with the operations <push> and <pop>.
+        """
+        parents: Dict[Hashable, Optional[Puzzle]] = {}
+        for solved in self._explore(puzzle, seen, frontier, push, pop,
+                                    parents, True):
+            path = _path_to(solved, parents)
+            if self.cache is not None and not seen:
+                self.cache.add_path(path)
+            return path
+        return []
+
+    def _explore(self, puzzle: Puzzle, seen: Optional[Set[Hashable]],
+                 frontier: Any, push: Callable[[Puzzle], None],
+                 pop: Callable[[], Puzzle],
+                 parents: Dict[Hashable, Optional[Puzzle]],
+                 follow_cache: bool = False) -> Iterator[Puzzle]:
+        """
+        Yield each solved state reachable from <puzzle>, visiting states in
+        the order given by the empty container <frontier> with the
+        operations <push> and <pop>, and recording in <parents> the state
+        each state was first reached from (None for <puzzle>).
+
+        Each state is recorded under its state key, so it is expanded at most
+        once; states in <seen> are never expanded. Solved states are not
+        expanded either.
+
+        With a cache, states it knows to be dead are not expanded, and if
+        <follow_cache> is True, a state with a known path to a solution
+        yields the end of that path instead of being expanded. A state whose
+        extensions are all found to be dead is added to the cache as dead,
+        even if the search goes on to yield; if nothing is yielded, every
+        state recorded is added as dead.
+        """
+        is_seen = _seen_filter(seen)
+        cache = self.cache if is_seen is None else None
+        found = False
+        # with a cache, pending[key] is the number of extensions of the
+        # expanded state with <key> not yet known to be dead, and above[key]
+        # is the key of the state the state with <key> was reached from
+        pending: Dict[Hashable, int] = {}
+        above: Dict[Hashable, Hashable] = {}
+
+        def dead(key: Hashable) -> None:
+            # Add the state with <key> to the cache as dead, and each state
+            # above it whose extensions are then all known to be dead.
+            while True:
+                cache.add_dead(key)
+                key = above.get(key)
+                if key not in pending:
+                    return
+                pending[key] -= 1
+                if pending[key]:
+                    return
+                del pending[key]
+
+        stats, clock = self.stats, time.perf_counter
+        if stats is not None:
+            stats.reset()
+        parents[puzzle.state_key()] = None
+        push(puzzle)
+        self.nodes_expanded = 0
+
+        while frontier:
+            parent = pop()
+            if stats is None:
+                solved = parent.is_solved()
+            else:
+                start = clock()
+                solved = parent.is_solved()
+                stats.is_solved_time += clock() - start
+            if solved:
+                if stats is not None:
+                    stats.stop()
+                found = True
+                yield parent
+                continue
+
+            if cache is not None:
+                parent_key = parent.state_key()
+                entry = cache.lookup(parent_key)
+                if entry is DEAD:
+                    dead(parent_key)
+                    continue
+                known = (cache.path_from(parent)
+                         if entry is not None and follow_cache else None)
+                if known:
+                    for state, next_state in zip(known, known[1:]):
+                        parents.setdefault(next_state.state_key(), state)
+                    found = True
+                    yield known[-1]
+                    continue
+
+            self.nodes_expanded += 1
+            if stats is None:
+                children = parent.extensions()
+            else:
+                start = clock()
+                children = parent.extensions()
+                stats.extensions_time += clock() - start
+                stats.seen_checks += len(children)
+            pushed = 0
+            for child in children:
+                key = child.state_key()
+                if key in parents or (is_seen is not None and is_seen(child)):
+                    if stats is not None:
+                        stats.seen_hits += 1
+                    continue
+                parents[key] = parent
+                push(child)
+                pushed += 1
+                if cache is not None:
+                    above[key] = parent_key
+            # a state with an extension reached from elsewhere is not known
+            # to be dead until the search ends
+            if cache is not None and pushed == len(children):
+                if pushed:
+                    pending[parent_key] = pushed
+                else:
+                    dead(parent_key)
+            if stats is not None:
+                stats.expanded(len(frontier), len(parents))
+
+        if cache is not None and not found:
+            for key in parents:
+                cache.add_dead(key)
+        if stats is not None:
+            stats.stop()
+
+
 class DfsSolver(Solver):
     """"
     A solver for full-information puzzles that uses
@@ -30,7 +212,7 @@ class DfsSolver(Solver):
     """
 
     def solve(self, puzzle: Puzzle,
-              seen: Optional[Set[str]] = None) -> List[Puzzle]:
+              seen: Optional[Set[Hashable]] = None) -> List[Puzzle]:
         """
         Return a list of puzzle states representing a path to a solution of
         <puzzle>. The first element in the list should be <puzzle>, the
@@ -44,45 +226,23 @@ class DfsSolver(Solver):
 
         Return an empty list if the puzzle has no solution.
 
-        <seen> is either None (default) or a set of puzzle states' string
-        representations, whose puzzle states can't be any part of the path to
-        the solution.
+        <seen> is either None (default) or a set of puzzle states' keys (see
+        Puzzle.state_key) or string representations, whose puzzle states
+        can't be any part of the path to the solution.
         """
-        stack = []
-        stack.append(puzzle)
-        child2parent = {}
-        child2parent[str(puzzle)] = [None]
-
-        while(len(stack)>0):
-            parent = stack.pop(-1)
-            if parent.is_solved() == True:
-                solved = parent 
-                break
-
-            next_states = parent.extensions()
-            if seen is not None:
-                next_unseen = [s for s in next_states if str(s) not in seen]
-            else:
-                next_unseen = next_states
-
-            for child in next_unseen:
-                str_child = str(child)
-                if str_child not in child2parent:
-                    child2parent[str_child] = []
-                child2parent[str_child].append(parent)
-                stack.append(child)
-        else:
-            return []
-
-        child = solved
-        path = [child]
-        parent = child2parent[str(child)][0]
-        while(parent is not None):
-            child = parent
-            path.insert(0, child)
-            parent = child2parent[str(child)][0]
+        stack = Stack()
+        return self._search(puzzle, seen, stack, stack.push, stack.pop)
 
-        return path      
+    def count_solutions(self, puzzle: Puzzle,
+                        limit: Optional[int] = None) -> int:
+        """
+        Return the number of distinct solved states that can be reached from
+        <puzzle>, in a single depth first search that stops as soon as
+        <limit> of them are found if <limit> is not None.
+        """
+        stack = Stack()
+        return _count(self._explore(puzzle, None, stack, stack.push,
+                                    stack.pop, {}), limit)
 
 
 class BfsSolver(Solver):
@@ -92,7 +252,7 @@ class BfsSolver(Solver):
     """
 
     def solve(self, puzzle: Puzzle,
-              seen: Optional[Set[str]] = None) -> List[Puzzle]:
+              seen: Optional[Set[Hashable]] = None) -> List[Puzzle]:
         """
         Return a list of puzzle states representing a path to a solution of
         <puzzle>. The first element in the list should be <puzzle>, the
@@ -106,42 +266,811 @@ class BfsSolver(Solver):
 
         Return an empty list if the puzzle has no solution.
 
-        <seen> is either None (default) or a set of puzzle states' string
-        representations, whose puzzle states can't be any part of the path to
-        the solution.
+        <seen> is either None (default) or a set of puzzle states' keys (see
+        Puzzle.state_key) or string representations, whose puzzle states
+        can't be any part of the path to the solution.
         """
         queue = Queue()
-        queue.enqueue(puzzle)
-        child2parent = {}
-        child2parent[str(puzzle)] = [None]
-
-        while(not queue.is_empty()):
-            parent = queue.dequeue()
-            if parent.is_solved() == True:
-                solved = parent 
-                break
+        return self._search(puzzle, seen, queue, queue.enqueue,
+                            queue.dequeue)
+
+    def count_solutions(self, puzzle: Puzzle,
+                        limit: Optional[int] = None) -> int:
+        """
+        Return the number of distinct solved states that can be reached from
+        <puzzle>, in a single breadth first search that stops as soon as
+        <limit> of them are found if <limit> is not None.
+        """
+        queue = Queue()
+        return _count(self._explore(puzzle, None, queue, queue.enqueue,
+                                    queue.dequeue, {}), limit)
+
+
+class BacktrackingSolver(Solver):
+    """"
+    A solver for full-information puzzles that uses a depth first search
+    strategy on a single working copy of the puzzle, making and undoing
+    moves in place (see Puzzle.moves) instead of creating a new Puzzle for
+    every state.
+
+    Only the moves on the current path are kept, so memory grows with the
+    depth of the search instead of the number of states explored. Unlike
+    DfsSolver, a state reached along two different paths is explored twice,
+    so this solver suits puzzles whose extensions form a tree, like Sudoku.
+    """
+
+    def solve(self, puzzle: Puzzle,
+              seen: Optional[Set[Hashable]] = None) -> List[Puzzle]:
+        """
+        Return a list of puzzle states representing a path to a solution of
+        <puzzle>, in the same format as DfsSolver.solve, or an empty list if
+        the puzzle has no solution.
+
+        <puzzle> itself is not changed. The states after the first are only
+        created once a solution is found, by replaying the moves that led
+        to it.
+
+        <seen> is either None (default) or a set of puzzle states' keys (see
+        Puzzle.state_key) or string representations, whose puzzle states
+        can't be any part of the path to the solution.
+        """
+        for log in self._backtrack(copy.deepcopy(puzzle), _seen_filter(seen)):
+            path = _replay(puzzle, [move for move, _ in log])
+            if self.cache is not None and not seen:
+                self.cache.add_path(path)
+            return path
+        return []
+
+    def count_solutions(self, puzzle: Puzzle,
+                        limit: Optional[int] = None) -> int:
+        """
+        Return the number of solved states that can be reached from
+        <puzzle>, in a single in-place search that stops as soon as <limit>
+        of them are found if <limit> is not None.
+
+        As states are not remembered, this is the number of distinct
+        solutions only if the puzzle's extensions form a tree.
+        """
+        return _count(self._backtrack(copy.deepcopy(puzzle), None), limit)
+
+    def _backtrack(self, work: Puzzle,
+                   is_seen: Optional[Callable[[Puzzle], bool]]
+                   ) -> Iterator[List[Tuple[Any, Any]]]:
+        """
+        Search depth first from <work>, changing it in place, and yield the
+        log of (move, undo record) pairs that leads to each solved state.
 
-            next_states = parent.extensions()
-            if seen is not None:
-                next_unseen = [s for s in next_states if str(s) not in seen]
+        States for which <is_seen> is True are never expanded. With a cache,
+        states it knows to be dead are not expanded either, and each state
+        with no solved state below it is added to the cache as dead.
+        """
+        stats, clock = self.stats, time.perf_counter
+        cache = self.cache if is_seen is None else None
+        if stats is not None:
+            stats.reset()
+        self.nodes_expanded = 0
+        if work.is_solved():
+            yield []
+            return
+        if cache is not None and cache.is_dead(work.state_key()):
+            return
+        # log[i] is the (move, undo record) pair made at depth i, and
+        # choices[i] holds the moves still to try at depth i; found[i] is
+        # the number of solutions found before choices[i] was made
+        log = []
+        choices = [iter(work.moves())]
+        solutions, found = 0, [0]
+        self.nodes_expanded = 1
+        if stats is not None:
+            stats.expanded(1, 0)
+
+        while choices:
+            move = next(choices[-1], None)
+            if move is None:
+                choices.pop()
+                if cache is not None and found.pop() == solutions:
+                    cache.add_dead(work.state_key())
+                if log:
+                    work.undo_move(log.pop()[1])
+                continue
+
+            record = work.apply_move(move)
+            if is_seen is not None:
+                if stats is not None:
+                    stats.seen_checks += 1
+                if is_seen(work):
+                    if stats is not None:
+                        stats.seen_hits += 1
+                    work.undo_move(record)
+                    continue
+            log.append((move, record))
+            if stats is None:
+                solved = work.is_solved()
+            else:
+                start = clock()
+                solved = work.is_solved()
+                stats.is_solved_time += clock() - start
+            if solved:
+                if stats is not None:
+                    stats.stop()
+                solutions += 1
+                yield log
+                # solved states are not expanded; try the next move instead
+                work.undo_move(log.pop()[1])
+                continue
+            if cache is not None:
+                if cache.is_dead(work.state_key()):
+                    work.undo_move(log.pop()[1])
+                    continue
+                found.append(solutions)
+
+            self.nodes_expanded += 1
+            if stats is None:
+                choices.append(iter(work.moves()))
             else:
-                next_unseen = next_states
-
-            for child in next_unseen:
-                str_child = str(child)
-                if str_child not in child2parent:
-                    child2parent[str_child] = []
-                child2parent[str_child].append(parent)
-                queue.enqueue(child)
+                start = clock()
+                choices.append(iter(work.moves()))
+                stats.extensions_time += clock() - start
+                stats.expanded(len(choices), len(log))
+
+        if stats is not None:
+            stats.stop()
+
+
+class DlxSolver(Solver):
+    """"
+    A solver for SudokuPuzzles of any size that treats the puzzle as an
+    exact cover problem (see SudokuPuzzle.exact_cover) and solves it with
+    Knuth's Algorithm X on dancing links.
+
+    nodes_expanded counts the column choices made by Algorithm X. With
+    stats, only that count and the elapsed time are collected.
+    """
+
+    def solve(self, puzzle: Puzzle,
+              seen: Optional[Set[Hashable]] = None) -> List[Puzzle]:
+        """
+        Return a list of puzzle states representing a path to a solution of
+        <puzzle>, in the same format as DfsSolver.solve, or an empty list if
+        the puzzle has no solution.
+
+        The path fills the positions in the order chosen by the puzzle's own
+        branching strategy, so each state is in the extensions of the one
+        before it.
+
+        <seen> is either None (default) or a set of puzzle states' keys (see
+        Puzzle.state_key) or string representations, whose puzzle states
+        can't be any part of the path to the solution.
+
+        Precondition: <puzzle> is a SudokuPuzzle.
+        """
+        is_seen = _seen_filter(seen)
+        if self.stats is not None:
+            self.stats.reset()
+        columns, moves, rows = puzzle.exact_cover()
+        problem = ExactCover(columns, rows)
+        self.nodes_expanded = 0
+        path = []
+        for solution in problem.solutions():
+            path = _follow(puzzle, [moves[i] for i in solution])
+            if is_seen is None or not any(is_seen(p) for p in path[1:]):
+                break
+            path = []
+        self._record(problem)
+        return path
+
+    def count_solutions(self, puzzle: Puzzle,
+                        limit: Optional[int] = None) -> int:
+        """
+        Return the number of solutions of <puzzle>, in a single exact cover
+        search that stops as soon as <limit> of them are found if <limit> is
+        not None.
+
+        Precondition: <puzzle> is a SudokuPuzzle.
+        """
+        if self.stats is not None:
+            self.stats.reset()
+        columns, _, rows = puzzle.exact_cover()
+        problem = ExactCover(columns, rows)
+        count = problem.count(limit)
+        self._record(problem)
+        return count
+
+    def _record(self, problem: ExactCover) -> None:
+        """
+        Record the search nodes of <problem>, and the time taken if this
+        solver has stats. Only these two are collected for DlxSolver.
+        """
+        self.nodes_expanded = problem.nodes
+        if self.stats is not None:
+            self.stats.nodes_expanded = problem.nodes
+            self.stats.stop()
+
+
+class BestFirstSolver(Solver):
+    """"
+    A solver for full-information puzzles that always expands the waiting
+    state its heuristic rates closest to a solution (greedy best-first
+    search), keeping the waiting states in a priority queue.
+
+    The heuristic is any function from a Puzzle to a number, where lower
+    means closer to a solution; it is never compared against solutions, so
+    it need not be exact. States are remembered by their state keys, as in
+    DfsSolver, so this works with any Puzzle subclass.
+
+    === Private Attributes ===
+    _heuristic: estimates how far a state is from a solution
+    _cost: gives the cost of the step from a state to one of its extensions
+    """
+    _heuristic: Callable[[Puzzle], float]
+    _cost: Callable[[Puzzle, Puzzle], float]
+
+    def __init__(self, heuristic: Callable[[Puzzle], float],
+                 cost: Optional[Callable[[Puzzle, Puzzle], float]] = None,
+                 stats: Optional[SearchStats] = None) -> None:
+        """
+        Initialize a new solver that ranks states by <heuristic>, where each
+        step from a state to one of its extensions costs <cost>(state,
+        extension) (1 by default), and collects <stats> if not None.
+        """
+        Solver.__init__(self, stats)
+        self._heuristic = heuristic
+        self._cost = cost or _unit_cost
+
+    def solve(self, puzzle: Puzzle,
+              seen: Optional[Set[Hashable]] = None) -> List[Puzzle]:
+        """
+        Return a list of puzzle states representing a path to a solution of
+        <puzzle>, in the same format as DfsSolver.solve, or an empty list if
+        the puzzle has no solution.
+
+        <seen> is either None (default) or a set of puzzle states' keys (see
+        Puzzle.state_key) or string representations, whose puzzle states
+        can't be any part of the path to the solution.
+        """
+        parents: Dict[Hashable, Optional[Puzzle]] = {}
+        for solved in self._best_first(puzzle, seen, parents):
+            return _path_to(solved, parents)
+        return []
+
+    def count_solutions(self, puzzle: Puzzle,
+                        limit: Optional[int] = None) -> int:
+        """
+        Return the number of distinct solved states that can be reached from
+        <puzzle>, in a single search that stops as soon as <limit> of them
+        are found if <limit> is not None.
+        """
+        return _count(self._best_first(puzzle, None, {}), limit)
+
+    def _priority(self, cost: float, estimate: float) -> float:
+        """
+        Return the priority of a state reached at total path <cost> whose
+        heuristic value is <estimate>; lower priorities are expanded first.
+        """
+        return estimate
+
+    def _best_first(self, puzzle: Puzzle, seen: Optional[Set[Hashable]],
+                    parents: Dict[Hashable, Optional[Puzzle]]
+                    ) -> Iterator[Puzzle]:
+        """
+        Yield each solved state reachable from <puzzle>, lowest priority
+        first, recording in <parents> the state each state was reached from
+        along the cheapest path found (None for <puzzle>).
+
+        A cheaper path to a state replaces the path it was reached by, and
+        the state is expanded again if it already was, so its extensions are
+        reached along the cheaper path too; a solved state is yielded only
+        once. States in <seen> are never expanded.
+        """
+        is_seen = _seen_filter(seen)
+        heuristic, cost, priority = self._heuristic, self._cost, self._priority
+        stats = self.stats
+        if stats is not None:
+            stats.reset()
+        frontier = PriorityQueue()
+        costs = {puzzle.state_key(): 0}
+        found = set()
+        parents[puzzle.state_key()] = None
+        frontier.push((puzzle, 0), priority(0, heuristic(puzzle)))
+        self.nodes_expanded = 0
+
+        while frontier:
+            parent, g = frontier.pop()
+            key = parent.state_key()
+            # a state is waiting once for each cheaper path found to it
+            if key in found or g > costs[key]:
+                continue
+            if parent.is_solved():
+                if stats is not None:
+                    stats.stop()
+                found.add(key)
+                yield parent
+                continue
+
+            self.nodes_expanded += 1
+            children = parent.extensions()
+            if stats is not None:
+                stats.seen_checks += len(children)
+            for child in children:
+                child_key = child.state_key()
+                child_g = g + cost(parent, child)
+                if (child_key in found
+                        or (child_key in costs and costs[child_key] <= child_g)
+                        or (is_seen is not None and is_seen(child))):
+                    if stats is not None:
+                        stats.seen_hits += 1
+                    continue
+                costs[child_key] = child_g
+                parents[child_key] = parent
+                frontier.push((child, child_g),
+                              priority(child_g, heuristic(child)))
+            if stats is not None:
+                stats.expanded(len(frontier), len(parents))
+
+        if stats is not None:
+            stats.stop()
+
+
+class AStarSolver(BestFirstSolver):
+    """"
+    A solver for full-information puzzles that uses A* search: it always
+    expands the waiting state with the lowest cost so far plus heuristic
+    estimate of the cost still to come.
+
+    If the heuristic never overestimates the remaining cost, the path
+    returned by solve is a cheapest one.
+    """
+
+    def _priority(self, cost: float, estimate: float) -> float:
+        """
+        Return the priority of a state reached at total path <cost> whose
+        heuristic value is <estimate>: their sum.
+        """
+        return cost + estimate
+
+
+class IterativeDeepeningSolver(Solver):
+    """"
+    A solver for full-information puzzles that uses iterative deepening:
+    a depth first search to depth 0, then 1, 2, ... until a solution is
+    found or no state was cut off by the depth limit.
+
+    Only the current path and its waiting extensions are kept, so memory
+    grows with the depth of the search, and the first solution found is a
+    shallowest one. States on the current path are never revisited, but
+    states reached along two different paths are explored twice. With
+    stats, only node counts, the deepest path and the elapsed time are
+    collected.
+
+    === Private Attributes ===
+    _max_depth: the deepest limit to search to, or None for no limit
+    """
+    _max_depth: Optional[int]
+
+    def __init__(self, max_depth: Optional[int] = None,
+                 stats: Optional[SearchStats] = None) -> None:
+        """
+        Initialize a new solver that searches no deeper than <max_depth>
+        moves from the puzzle if it is not None, and collects <stats> if
+        not None.
+        """
+        Solver.__init__(self, stats)
+        self._max_depth = max_depth
+
+    def solve(self, puzzle: Puzzle,
+              seen: Optional[Set[Hashable]] = None) -> List[Puzzle]:
+        """
+        Return a list of puzzle states representing a path to a solution of
+        <puzzle>, in the same format as DfsSolver.solve, or an empty list if
+        the puzzle has no solution within the maximum depth.
+
+        <seen> is either None (default) or a set of puzzle states' keys (see
+        Puzzle.state_key) or string representations, whose puzzle states
+        can't be any part of the path to the solution.
+        """
+        for path in self._deepen(puzzle, _seen_filter(seen)):
+            return path
+        return []
+
+    def count_solutions(self, puzzle: Puzzle,
+                        limit: Optional[int] = None) -> int:
+        """
+        Return the number of solved states that can be reached from
+        <puzzle> within the maximum depth, stopping as soon as <limit> of
+        them are found if <limit> is not None.
+
+        Each iteration only counts the solutions at its depth limit, so
+        this is the number of distinct solutions if the puzzle's
+        extensions form a tree.
+        """
+        return _count(self._deepen(puzzle, None), limit)
+
+    def _deepen(self, puzzle: Puzzle,
+                is_seen: Optional[Callable[[Puzzle], bool]]
+                ) -> Iterator[List[Puzzle]]:
+        """
+        Yield the path from <puzzle> to each solved state reachable from it,
+        shallowest first, by depth first searches to increasing depth
+        limits. Each solved state is yielded by the iteration whose limit is
+        its depth. States for which <is_seen> is True are never expanded.
+        """
+        stats = self.stats
+        if stats is not None:
+            stats.reset()
+        self.nodes_expanded = 0
+        if puzzle.is_solved():
+            yield [puzzle]
+            return
+
+        for depth in itertools.count(1):
+            if self._max_depth is not None and depth > self._max_depth:
+                break
+            path, keys = [puzzle], [puzzle.state_key()]
+            choices = [iter(puzzle.extensions())]
+            self.nodes_expanded += 1
+            cut_off = False
+            while choices:
+                child = next(choices[-1], None)
+                if child is None:
+                    choices.pop()
+                    path.pop()
+                    keys.pop()
+                    continue
+                key = child.state_key()
+                if key in keys or (is_seen is not None and is_seen(child)):
+                    continue
+                if child.is_solved():
+                    # shallower solutions were found by earlier iterations
+                    if len(path) == depth:
+                        if stats is not None:
+                            stats.nodes_expanded = self.nodes_expanded
+                            stats.stop()
+                        yield path + [child]
+                    continue
+                if len(path) == depth:
+                    cut_off = True
+                    continue
+                path.append(child)
+                keys.append(key)
+                choices.append(iter(child.extensions()))
+                self.nodes_expanded += 1
+                if stats is not None:
+                    stats.expanded(len(path), len(path))
+            if not cut_off:
+                break
+
+        if stats is not None:
+            stats.nodes_expanded = self.nodes_expanded
+            stats.stop()
+
+
+class MemoryBoundedSolver(Solver):
+    """"
+    A solver for full-information puzzles that uses a depth first search
+    which remembers at most a fixed number of the states it has expanded.
+    When the limit is reached, the state expanded least recently is
+    forgotten, and may be explored again if it is reached again.
+
+    Only the current path, its waiting extensions and the remembered states
+    are kept, so the memory used is bounded by the limit and the depth of
+    the search. States on the current path are always remembered, so the
+    search can't go round in a cycle.
+
+    === Private Attributes ===
+    _max_states: the largest number of expanded states to remember
+    """
+    _max_states: int
+
+    def __init__(self, max_states: int = 100000,
+                 stats: Optional[SearchStats] = None) -> None:
+        """
+        Initialize a new solver that remembers at most <max_states>
+        expanded states, and collects <stats> if not None.
+        """
+        Solver.__init__(self, stats)
+        self._max_states = max_states
+
+    def solve(self, puzzle: Puzzle,
+              seen: Optional[Set[Hashable]] = None) -> List[Puzzle]:
+        """
+        Return a list of puzzle states representing a path to a solution of
+        <puzzle>, in the same format as DfsSolver.solve, or an empty list if
+        the puzzle has no solution.
+
+        <seen> is either None (default) or a set of puzzle states' keys (see
+        Puzzle.state_key) or string representations, whose puzzle states
+        can't be any part of the path to the solution.
+        """
+        for path in self._bounded(puzzle, _seen_filter(seen)):
+            return path
+        return []
+
+    def count_solutions(self, puzzle: Puzzle,
+                        limit: Optional[int] = None) -> int:
+        """
+        Return the number of solved states that can be reached from
+        <puzzle>, in a single search that stops as soon as <limit> of them
+        are found if <limit> is not None.
+
+        A solved state that was forgotten may be counted again, so this is
+        the number of distinct solutions only if no state had to be
+        forgotten or the puzzle's extensions form a tree.
+        """
+        return _count(self._bounded(puzzle, None), limit)
+
+    def _bounded(self, puzzle: Puzzle,
+                 is_seen: Optional[Callable[[Puzzle], bool]]
+                 ) -> Iterator[List[Puzzle]]:
+        """
+        Search depth first from <puzzle> and yield the path to each solved
+        state found, remembering at most self._max_states of the states
+        expanded (and solved states found) off the current path. States for
+        which <is_seen> is True are never expanded.
+        """
+        stats = self.stats
+        if stats is not None:
+            stats.reset()
+        self.nodes_expanded = 0
+        if puzzle.is_solved():
+            yield [puzzle]
+            return
+
+        # the remembered states' keys, least recently expanded first
+        expanded = OrderedDict()
+        path, keys = [puzzle], {puzzle.state_key()}
+        choices = [iter(puzzle.extensions())]
+        self.nodes_expanded = 1
+
+        while choices:
+            child = next(choices[-1], None)
+            if child is None:
+                choices.pop()
+                key = path.pop().state_key()
+                keys.discard(key)
+                expanded[key] = None
+                if len(expanded) > self._max_states:
+                    expanded.popitem(last=False)
+                continue
+            key = child.state_key()
+            if stats is not None:
+                stats.seen_checks += 1
+            if (key in keys or key in expanded
+                    or (is_seen is not None and is_seen(child))):
+                if stats is not None:
+                    stats.seen_hits += 1
+                continue
+            if child.is_solved():
+                if stats is not None:
+                    stats.stop()
+                yield path + [child]
+                expanded[key] = None
+                if len(expanded) > self._max_states:
+                    expanded.popitem(last=False)
+                continue
+            path.append(child)
+            keys.add(key)
+            choices.append(iter(child.extensions()))
+            self.nodes_expanded += 1
+            if stats is not None:
+                stats.expanded(len(path), len(expanded) + len(keys))
+
+        if stats is not None:
+            stats.stop()
+
+
+class ParallelSolver(Solver):
+    """"
+    A solver that splits the search for one puzzle across a pool of
+    processes. The first few levels of extensions are expanded here, and
+    the subtrees below them are searched by another solver in the workers.
+
+    solve stops every worker as soon as one of them finds a solution, and
+    count_solutions adds up the workers' counts. The subtrees are only
+    disjoint if the puzzle's extensions form a tree, like Sudoku's; for
+    other puzzles, count_solutions may count a solution more than once.
+
+    nodes_expanded counts the states expanded here and by the workers that
+    finished their subtree.
+
+    === Private Attributes ===
+    _solver: the solver used on each subtree
+    _workers: the number of worker processes
+    _subtrees: the number of subtrees to aim for before starting the workers
+    """
+    _solver: Solver
+    _workers: int
+    _subtrees: int
+
+    def __init__(self, solver: Optional[Solver] = None,
+                 workers: Optional[int] = None,
+                 subtrees: Optional[int] = None) -> None:
+        """
+        Initialize a new solver that searches subtrees with <solver> (a
+        BacktrackingSolver by default) in <workers> processes (one per core
+        by default), splitting the search into at least <subtrees> subtrees
+        where possible (four per worker by default).
+
+        Stats are not collected across processes; give <solver> stats to
+        collect them for the subtrees searched in this process.
+        """
+        Solver.__init__(self)
+        self._solver = solver or BacktrackingSolver()
+        self._workers = workers or os.cpu_count() or 1
+        self._subtrees = subtrees or 4 * self._workers
+
+    def solve(self, puzzle: Puzzle,
+              seen: Optional[Set[Hashable]] = None) -> List[Puzzle]:
+        """
+        Return a list of puzzle states representing a path to a solution of
+        <puzzle>, in the same format as DfsSolver.solve, or an empty list if
+        the puzzle has no solution.
+
+        <seen> is either None (default) or a set of puzzle states' keys (see
+        Puzzle.state_key) or string representations, whose puzzle states
+        can't be any part of the path to the solution.
+        """
+        paths, solved = self._split(puzzle, seen)
+        if solved:
+            return solved[0]
+        tasks = [(i, self._solver, path[-1], seen)
+                 for i, path in enumerate(paths)]
+        with multiprocessing.Pool(self._workers) as pool:
+            for i, path, nodes in pool.imap_unordered(_solve_subtree, tasks):
+                self.nodes_expanded += nodes
+                if path:
+                    # leaving the with block terminates the other workers
+                    return paths[i] + path[1:]
+        return []
+
+    def count_solutions(self, puzzle: Puzzle,
+                        limit: Optional[int] = None) -> int:
+        """
+        Return the number of solved states that can be reached from
+        <puzzle>, stopping every worker as soon as <limit> of them are found
+        if <limit> is not None.
+        """
+        paths, solved = self._split(puzzle, None)
+        count = len(solved)
+        if limit is not None and count >= limit:
+            return limit
+        tasks = [(self._solver, path[-1], limit) for path in paths]
+        with multiprocessing.Pool(self._workers) as pool:
+            for found, nodes in pool.imap_unordered(_count_subtree, tasks):
+                self.nodes_expanded += nodes
+                count += found
+                if limit is not None and count >= limit:
+                    return limit
+        return count
+
+    def _split(self, puzzle: Puzzle, seen: Optional[Set[Hashable]]
+               ) -> Tuple[List[List[Puzzle]], List[List[Puzzle]]]:
+        """
+        Expand <puzzle> breadth first, a level at a time, until there are at
+        least self._subtrees unexpanded states or none are left. Return the
+        paths from <puzzle> to each unexpanded state, and the paths to the
+        solved states met on the way.
+        """
+        is_seen = _seen_filter(seen)
+        keys = {puzzle.state_key()}
+        paths, solved = [[puzzle]], []
+        self.nodes_expanded = 0
+        while paths and len(paths) < self._subtrees:
+            level = []
+            for path in paths:
+                if path[-1].is_solved():
+                    solved.append(path)
+                    continue
+                self.nodes_expanded += 1
+                for child in path[-1].extensions():
+                    key = child.state_key()
+                    if key in keys or (is_seen is not None and is_seen(child)):
+                        continue
+                    keys.add(key)
+                    level.append(path + [child])
+            paths = level
+        return paths, solved
+
+
+def _solve_subtree(task: Tuple[int, Solver, Puzzle, Optional[Set[Hashable]]]
+                   ) -> Tuple[int, List[Puzzle], int]:
+    """
+    Solve the subtree in <task>, a (subtree index, solver, subtree root,
+    seen) tuple, in a ParallelSolver worker. Return the subtree index, the
+    path found, and the number of states expanded.
+    """
+    i, solver, root, seen = task
+    path = solver.solve(root, seen)
+    return i, path, solver.nodes_expanded
+
+
+def _count_subtree(task: Tuple[Solver, Puzzle, Optional[int]]
+                   ) -> Tuple[int, int]:
+    """
+    Count the solutions in the subtree in <task>, a (solver, subtree root,
+    limit) tuple, in a ParallelSolver worker. Return the count and the
+    number of states expanded.
+    """
+    solver, root, limit = task
+    found = solver.count_solutions(root, limit)
+    return found, solver.nodes_expanded
+
+
+def _count(solutions: Iterator[Any], limit: Optional[int]) -> int:
+    """
+    Return the number of items in <solutions>, taking no more than <limit>
+    of them if <limit> is not None.
+    """
+    count = 0
+    for _ in solutions:
+        count += 1
+        if limit is not None and count >= limit:
+            break
+    return count
+
+
+def _unit_cost(parent: Puzzle, child: Puzzle) -> float:
+    """
+    Return the cost of the step from <parent> to <child>: 1 for every step.
+    """
+    return 1
+
+
+def _seen_filter(seen: Optional[Set[Hashable]]
+                 ) -> Optional[Callable[[Puzzle], bool]]:
+    """
+    Return a function that reports whether a puzzle state is in <seen>, or
+    None if there is nothing in <seen>.
+
+    <seen> may hold state keys or, as older callers do, the str() of puzzle
+    states. The slower str() lookup is only made when such strings are
+    actually present.
+    """
+    if not seen:
+        return None
+    strings = {item for item in seen if isinstance(item, str)}
+    if not strings:
+        return lambda p: p.state_key() in seen
+    return lambda p: p.state_key() in seen or str(p) in strings
+
+
+def _path_to(solved: Puzzle,
+             parents: Dict[Hashable, Optional[Puzzle]]) -> List[Puzzle]:
+    """
+    Return the path from the root of <parents> to <solved>, where <parents>
+    maps each state key to the state it was reached from (None for the root).
+    """
+    path = [solved]
+    parent = parents[solved.state_key()]
+    while parent is not None:
+        path.append(parent)
+        parent = parents[parent.state_key()]
+    path.reverse()
+    return path
+
+
+def _replay(puzzle: Puzzle, moves: List[Any]) -> List[Puzzle]:
+    """
+    Return the path of states from <puzzle> through each of <moves> in turn.
+    """
+    path = [puzzle]
+    for move in moves:
+        path.append(path[-1].extend(move))
+    return path
+
+
+def _follow(puzzle: Puzzle, solution: List[Any]) -> List[Puzzle]:
+    """
+    Return the path of states from the SudokuPuzzle <puzzle> to the solution
+    made by the moves in <solution>, taking at each state the extension
+    that agrees with <solution>.
+    """
+    wanted = {(r, c): symbol for r, c, symbol in solution}
+    path = [puzzle]
+    while not path[-1].is_solved():
+        for r, c, symbol in path[-1].moves():
+            if wanted[(r, c)] == symbol:
+                path.append(path[-1].extend((r, c, symbol)))
+                break
         else:
             return []
-        
-        child = solved
-        path = [child]
-        parent = child2parent[str(child)][0]
-        while(parent is not None):
-            child = parent
-            path.insert(0, child)
-            parent = child2parent[str(child)][0]
-
-        return path    
+    return path
@@ -0,0 +1,111 @@
+from __future__ import annotations
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class SearchStats:
+    """
+    Counters and timings of a solver's search, collected when a SearchStats
+    is given to the solver (see Solver.__init__). They are reset at the
+    start of each search, so they describe the most recent one.
+
+    If <progress> is given, it is called with a snapshot (see snapshot)
+    every <progress_every> expanded states, which lets a long search be
+    watched while it runs.
+
+    === Public Attributes ===
+    nodes_expanded: the number of states whose extensions (or moves) were
+      generated
+    max_frontier: the largest number of states waiting to be expanded at
+      once (for in-place solvers, the deepest point of the search)
+    seen_checks: the number of generated states looked up among the states
+      already recorded or in seen
+    seen_hits: the number of those lookups that found the state, so that it
+      was not explored again
+    parent_map_size: the number of states recorded with the state they were
+      reached from (for in-place solvers, the length of the move log)
+    extensions_time: the seconds spent generating extensions (or moves)
+    is_solved_time: the seconds spent in is_solved
+    elapsed: the seconds the search has run for
+    progress: the function snapshots are reported to, or None
+    progress_every: the number of expanded states between snapshots
+
+    === Private Attributes ===
+    _start: the time.perf_counter() value when the search started
+    """
+    nodes_expanded: int
+    max_frontier: int
+    seen_checks: int
+    seen_hits: int
+    parent_map_size: int
+    extensions_time: float
+    is_solved_time: float
+    elapsed: float
+    progress: Optional[Callable[[Dict[str, float]], Any]]
+    progress_every: int
+    _start: float
+
+    def __init__(self,
+                 progress: Optional[Callable[[Dict[str, float]], Any]] = None,
+                 progress_every: int = 10000) -> None:
+        """Initialize a new SearchStats with every counter at zero."""
+        self.progress = progress
+        self.progress_every = progress_every
+        self.reset()
+
+    def __str__(self) -> str:
+        """Return a one-line summary of these statistics."""
+        return ('%d nodes in %.3fs (extensions %.3fs, is_solved %.3fs), '
+                'max frontier %d, %d states recorded, seen hit rate %.1f%%'
+                % (self.nodes_expanded, self.elapsed, self.extensions_time,
+                   self.is_solved_time, self.max_frontier,
+                   self.parent_map_size, 100 * self.hit_rate()))
+
+    def reset(self) -> None:
+        """Set every counter back to zero and restart the clock."""
+        self.nodes_expanded = 0
+        self.max_frontier = 0
+        self.seen_checks = 0
+        self.seen_hits = 0
+        self.parent_map_size = 0
+        self.extensions_time = 0.0
+        self.is_solved_time = 0.0
+        self.elapsed = 0.0
+        self._start = time.perf_counter()
+
+    def hit_rate(self) -> float:
+        """Return the fraction of seen checks that were hits."""
+        return self.seen_hits / self.seen_checks if self.seen_checks else 0.0
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return the current counters and timings as a dictionary."""
+        self.elapsed = time.perf_counter() - self._start
+        return {'nodes_expanded': self.nodes_expanded,
+                'max_frontier': self.max_frontier,
+                'seen_checks': self.seen_checks,
+                'seen_hits': self.seen_hits,
+                'seen_hit_rate': self.hit_rate(),
+                'parent_map_size': self.parent_map_size,
+                'extensions_time': self.extensions_time,
+                'is_solved_time': self.is_solved_time,
+                'elapsed': self.elapsed,
+                'states_per_sec': (self.nodes_expanded / self.elapsed
+                                   if self.elapsed else 0.0)}
+
+    def expanded(self, frontier: int, parent_map: int) -> None:
+        """
+        Record that one more state was expanded, leaving <frontier> states
+        waiting and <parent_map> states recorded, and report a snapshot if
+        one is due.
+        """
+        self.nodes_expanded += 1
+        if frontier > self.max_frontier:
+            self.max_frontier = frontier
+        self.parent_map_size = parent_map
+        if (self.progress is not None
+                and self.nodes_expanded % self.progress_every == 0):
+            self.progress(self.snapshot())
+
+    def stop(self) -> None:
+        """Record the time the search has run for so far."""
+        self.elapsed = time.perf_counter() - self._start
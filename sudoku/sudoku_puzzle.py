@@ -1,9 +1,23 @@
 from __future__ import annotations
-from typing import List, Set
+import itertools
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 from puzzle import Puzzle
 
 EMPTY_CELL = ' '
 
+# A move on a SudokuPuzzle: place a symbol at a (row, column) position
+Move = Tuple[int, int, str]
+
+# The symbols of each puzzle size in the line-per-puzzle format (see
+# from_line), and the characters that stand for an empty position there
+LINE_SYMBOLS = {4: '1234', 9: '123456789', 16: '123456789ABCDEFG',
+                25: 'ABCDEFGHIJKLMNOPQRSTUVWXY'}
+LINE_EMPTY = '.0'
+
+# The rows, columns and subsquares of an n x n grid, each as a list of
+# positions, for each n seen so far
+_UNITS: Dict[int, List[List[Tuple[int, int]]]] = {}
+
 
 class SudokuPuzzle(Puzzle):
     """
@@ -15,21 +29,61 @@ class SudokuPuzzle(Puzzle):
           represents one row of the grid
     _symbol_set: the set of all symbols that each row/column/subsquare must have
       exactly one of, for this puzzle to be solved
+    _sqn: the number of rows/columns in each subsquare
+    _bits: maps each symbol to the single bit that represents it
+    _symbol_of: maps each single bit back to its symbol
+    _full: the mask with one bit set for every symbol in _symbol_set
+    _row_used: _row_used[r] is the mask of the symbols already in row r
+    _col_used: _col_used[c] is the mask of the symbols already in column c
+    _box_used: _box_used[b] is the mask of the symbols already in subsquare b,
+      where subsquares are numbered left to right, top to bottom
+    _empty: the number of empty positions in _grid
+    _clashes: the number of symbols in the grid given to __init__ that
+      repeat a symbol already in their row, column or subsquare
+    _key: the cached result of state_key, or None if it is not computed yet
+    _branching: chooses the empty position that extensions branch on
+    _propagate: whether each move also fills every position it forces
+    _dead: whether propagation showed that this puzzle can't be solved
 
 
     === Representation Invariants ===
     _n is a positive, square integer >= 4 (e.g. 4, 9, 16)
+    _row_used, _col_used and _box_used always agree with _grid
+    _empty always agrees with _grid
+    every symbol placed after __init__ is legal where it is placed, so
+      _clashes never changes
     """
     _n: int
     _grid: List[List[str]]
     _symbol_set: Set[str]
+    _sqn: int
+    _bits: Dict[str, int]
+    _symbol_of: Dict[int, str]
+    _full: int
+    _row_used: List[int]
+    _col_used: List[int]
+    _box_used: List[int]
+    _empty: int
+    _clashes: int
+    _key: Optional[bytes]
+    _branching: BranchingStrategy
+    _propagate: bool
+    _dead: bool
 
     def __init__(self, n: int, grid: List[List[str]],
-                 symbol_set: Set[str]) -> None:
+                 symbol_set: Set[str],
+                 branching: Optional[BranchingStrategy] = None,
+                 propagate: bool = False) -> None:
         """
         Create a new n x n SudokuPuzzle with symbols
         from <symbol_set> and the specified <grid>.
 
+        <branching> chooses the empty position that extensions fill in
+        (the first empty position in row-major order by default). If
+        <propagate> is True, every extension also fills the naked and hidden
+        singles that its move leaves, and extensions that this shows to be
+        unsolvable are dropped. Extensions inherit both settings.
+
         Note:
         - Grid symbols are represented as letters or numerals
           and must be single characters.
@@ -45,6 +99,30 @@ class SudokuPuzzle(Puzzle):
         """
 
         self._n, self._grid, self._symbol_set = n, grid, symbol_set
+        self._sqn = round(n ** (1 / 2))
+        self._bits = {symbol: 1 << i
+                      for i, symbol in enumerate(sorted(symbol_set))}
+        self._symbol_of = {bit: symbol for symbol, bit in self._bits.items()}
+        self._full = (1 << n) - 1
+        self._row_used = [0] * n
+        self._col_used = [0] * n
+        self._box_used = [0] * n
+        self._empty = 0
+        self._clashes = 0
+        self._key = None
+        self._branching = branching or FIRST_EMPTY
+        self._propagate = propagate
+        self._dead = False
+        for r in range(n):
+            for c in range(n):
+                if grid[r][c] == EMPTY_CELL:
+                    self._empty += 1
+                    continue
+                bit = self._bits[grid[r][c]]
+                if (self._row_used[r] | self._col_used[c]
+                        | self._box_used[self._box(r, c)]) & bit:
+                    self._clashes += 1
+                self._mark(r, c, bit)
 
     def __eq__(self, other: SudokuPuzzle) -> bool:
         """
@@ -57,6 +135,12 @@ class SudokuPuzzle(Puzzle):
         return (self._grid == other._grid
                 and self._symbol_set == other._symbol_set)
 
+    def __hash__(self) -> int:
+        """
+        Return a hash of this SudokuPuzzle, consistent with __eq__.
+        """
+        return hash(self.state_key())
+
     def __str__(self) -> str:
         """
         Return a human-readable string representation of this SudokuPuzzle.
@@ -77,63 +161,216 @@ class SudokuPuzzle(Puzzle):
         rslt += div
         return rslt.rstrip()
 
+    def to_line(self) -> str:
+        """
+        Return this SudokuPuzzle in the line-per-puzzle format: its
+        positions in row-major order, with '.' for each empty position.
+
+        >>> s = SudokuPuzzle(4, [["A", "B", "C", "D"], ["C", "D", " ", " "], \
+        [" ", " ", " ", " "], [" ", " ", " ", " "]], {"A", "B", "C", "D"})
+        >>> s.to_line()
+        'ABCDCD..........'
+        """
+        return ''.join([''.join(row) for row in self._grid]).replace(
+            EMPTY_CELL, '.')
+
+    def state_key(self) -> bytes:
+        """
+        Return the cells of this SudokuPuzzle in row-major order, with
+        EMPTY_CELL for each empty cell, encoded as bytes.
+
+        >>> s = SudokuPuzzle(4, [["A", "B", "C", "D"], ["C", "D", " ", " "], \
+        [" ", " ", " ", " "], [" ", " ", " ", " "]], {"A", "B", "C", "D"})
+        >>> s.state_key()
+        b'ABCDCD          '
+        """
+        if self._key is None:
+            self._key = ''.join([''.join(row) for row in self._grid]).encode()
+        return self._key
+
+    def canonical_key(self) -> bytes:
+        """
+        Return a key that is equal for two SudokuPuzzles of the same size
+        exactly when one can be turned into the other by relabelling its
+        symbols, reordering the rows within a band of subsquares or the
+        columns within a stack, reordering the bands or the stacks, and
+        transposing. Equivalent puzzles are solved alike, so this is a key
+        to deduplicate puzzles or states on.
+
+        The key is the least such form of the grid, with empty positions
+        as 0 and the symbols numbered in order of first appearance. For
+        puzzles larger than 9 x 9, to keep the search small, the key only
+        covers relabelling the symbols, reordering the rows within a band,
+        and reordering the bands or the stacks: the columns within a stack
+        are kept in order and the grid is not transposed, so fewer
+        equivalent puzzles share a key.
+
+        >>> s = SudokuPuzzle(4, [["A", "B", " ", " "], [" ", " ", " ", " "], \
+        [" ", " ", " ", " "], [" ", " ", " ", " "]], {"A", "B", "C", "D"})
+        >>> t = SudokuPuzzle(4, [[" ", " ", " ", " "], [" ", " ", " ", " "], \
+        [" ", "D", " ", " "], [" ", "A", " ", " "]], {"A", "B", "C", "D"})
+        >>> s.canonical_key() == t.canonical_key()
+        True
+        >>> line = '123456789ABCDEFG56781234DEFG9ABC' + '.' * 224
+        >>> u = from_line(line)
+        >>> v = from_line(line[16:32] + line[:16] + line[32:])
+        >>> u.canonical_key() == v.canonical_key()
+        True
+        >>> w = from_line(line[1] + line[0] + line[2:16]
+        ...               + line[17] + line[16] + line[18:])
+        >>> u.canonical_key() == w.canonical_key()
+        False
+        """
+        values = [[self._bits[symbol].bit_length() if symbol != EMPTY_CELL
+                   else 0 for symbol in row] for row in self._grid]
+        return bytes(v for row in _least_form(values, self._sqn) for v in row)
+
     def is_solved(self) -> bool:
         """
         Return True if this SudokuPuzzle is solved, False otherwise.
+
+        Only legal symbols are ever placed after the puzzle is created, so
+        it is solved exactly when it is full and its initial grid repeated
+        no symbol. See verify for a check that scans the whole grid.
+
+        >>> s = SudokuPuzzle(4, [["A", "B", "C", "D"], ["C", "D", "A", "B"], \
+        ["B", "A", "D", "C"], ["D", "C", "B", " "]], {"A", "B", "C", "D"})
+        >>> s.is_solved()
+        False
+        >>> s.extensions()[0].is_solved()
+        True
+        """
+        return not self._empty and not self._clashes
+
+    def verify(self) -> bool:
+        """
+        Return True if every row, column and subsquare of this SudokuPuzzle
+        holds each of its symbols exactly once, checking the grid itself
+        rather than the counts that is_solved relies on.
+
+        >>> s = SudokuPuzzle(4, [["A", "B", "C", "D"], ["C", "D", "A", "B"], \
+        ["B", "A", "D", "C"], ["D", "C", "B", "A"]], {"A", "B", "C", "D"})
+        >>> s.verify()
+        True
         """
-        # check if there are any EMPTY_CELLs left
         if any(EMPTY_CELL in row for row in self._grid):
             return False
-        # check that all rows and columns have correct symbols
-        for i in range(self._n):
-            for j in range(self._n):
-                # row
-                if self._row_set(i) != self._symbol_set:
-                    return False
-                if self._column_set(j) != self._symbol_set:
-                    return False
-        # check that all subsquares have correct symbols
-        sqn = round(self._n ** 0.5)
-        for i in range(0, self._n, sqn):
-            for j in range(0, self._n, sqn):
-                if self._subsquare_set(i, j) != self._symbol_set:
-                    return False
-        return True
+        sqn = self._sqn
+        return (all(self._row_set(i) == self._symbol_set
+                    and self._column_set(i) == self._symbol_set
+                    for i in range(self._n))
+                and all(self._subsquare_set(i, j) == self._symbol_set
+                        for i in range(0, self._n, sqn)
+                        for j in range(0, self._n, sqn)))
 
     def extensions(self) -> List[SudokuPuzzle]:
         """
         Return list of extensions of SudokuPuzzle self.
         """
-        # temporary variables to give convenient names to each attribute
-        symbols, symbol_set, n = self._grid, self._symbol_set, self._n
-        if not any(EMPTY_CELL in row for row in symbols):
+        children = [self.extend(move) for move in self.moves()]
+        if self._propagate:
+            return [child for child in children if not child._dead]
+        return children
+
+    def moves(self) -> List[Move]:
+        """
+        Return the moves that fill the empty position chosen by this
+        SudokuPuzzle's branching strategy with each symbol that is legal
+        there.
+
+        With propagation on, a move may turn out to leave the puzzle
+        unsolvable; extensions leaves out the puzzles such moves lead to.
+
+        >>> s = SudokuPuzzle(4, [["A", "B", "C", "D"], ["C", "D", " ", " "], \
+        [" ", " ", " ", " "], [" ", " ", " ", " "]], {"A", "B", "C", "D"})
+        >>> s.moves()
+        [(1, 2, 'A'), (1, 2, 'B')]
+        """
+        if self._dead:
             return []
-        # get position of first empty position
-        r = 0  # row with first empty position
-        while EMPTY_CELL not in symbols[r]:
-            r += 1
-        c = symbols[r].index(EMPTY_CELL)  # column with first empty position
-
-        # allowed symbols at position (r, c)
-        # A | B == A.union(B)
-        allowed_symbols = (self._symbol_set
-                           - (self._row_set(r)
-                              | self._column_set(c)
-                              | self._subsquare_set(r, c)))
-
-        # list of SudokuPuzzles with each legal digit at position r, c
-        return_lst = []
-        for symbol in allowed_symbols:
-            # NOTE: type(self)(...) means create a new SudokuPuzzle,
-            # we do this here so that if we were to create a subclass of
-            # SudokuPuzzle later, then this will work as intended
-            new_puzzle = type(self)(n, symbols[:r]
-                                    + [symbols[r][:c]
-                                       + [symbol]
-                                       + symbols[r][c + 1:]]
-                                    + symbols[r + 1:], symbol_set)
-            return_lst.append(new_puzzle)
-        return return_lst
+        position = self._branching.choose(self)
+        if position is None:
+            return []
+        r, c = position
+        return [(r, c, symbol)
+                for symbol in self._symbols_in(self._allowed(r, c))]
+
+    def apply_move(self, move: Move) -> List[Tuple[int, int]]:
+        """
+        Place the symbol of <move> in this SudokuPuzzle, followed by any
+        symbols it forces if propagation is on, and return the list of
+        positions that were filled.
+
+        The rows that change are copied first, so puzzles that share rows
+        with this one (such as its parent) are left unchanged.
+        """
+        r, c, symbol = move
+        self._place(r, c, symbol)
+        filled = [(r, c)]
+        if self._propagate:
+            self._fill_singles(filled)
+        self._key = None
+        return filled
+
+    def undo_move(self, record: List[Tuple[int, int]]) -> None:
+        """
+        Empty the positions in <record> again, as returned by apply_move.
+        """
+        for r, c in reversed(record):
+            bit = self._bits[self._grid[r][c]]
+            self._row_used[r] &= ~bit
+            self._col_used[c] &= ~bit
+            self._box_used[self._box(r, c)] &= ~bit
+            self._grid[r][c] = EMPTY_CELL
+        self._empty += len(record)
+        # moves are only made on puzzles that are not known to be dead
+        self._dead = False
+        self._key = None
+
+    def extend(self, move: Move) -> SudokuPuzzle:
+        """
+        Return a new SudokuPuzzle that is this one after <move>.
+        """
+        child = self._with_symbol(*move)
+        if self._propagate:
+            child._fill_singles([])
+        return child
+
+    def exact_cover(self) -> Tuple[List[int], List[Move], List[List[int]]]:
+        """
+        Return the constraints this SudokuPuzzle still has to satisfy, the
+        legal moves, and for each move the constraints it satisfies, so that
+        the puzzle is solved by exactly those sets of moves that satisfy
+        every constraint exactly once.
+
+        The constraints are that each empty position gets a symbol and that
+        each row, column and subsquare gets each of its missing symbols.
+
+        >>> s = SudokuPuzzle(4, [["A", "B", "C", "D"], ["C", "D", "A", "B"], \
+        ["B", "A", "D", "C"], ["D", "C", "B", " "]], {"A", "B", "C", "D"})
+        >>> s.exact_cover()
+        ([15, 28, 44, 60], [(3, 3, 'A')], [[15, 28, 44, 60]])
+        """
+        n, n2 = self._n, self._n * self._n
+        empties = [(r, c) for r in range(n) for c in range(n)
+                   if self._grid[r][c] == EMPTY_CELL]
+
+        columns = [r * n + c for r, c in empties]
+        for offset, used in ((n2, self._row_used), (2 * n2, self._col_used),
+                             (3 * n2, self._box_used)):
+            for i in range(n):
+                columns.extend(offset + i * n + bit.bit_length() - 1
+                               for bit in self._bits_in(self._full & ~used[i]))
+
+        moves, rows = [], []
+        for r, c in empties:
+            b = self._box(r, c)
+            for bit in self._bits_in(self._allowed(r, c)):
+                k = bit.bit_length() - 1
+                moves.append((r, c, self._symbol_of[bit]))
+                rows.append([r * n + c, n2 + r * n + k, 2 * n2 + c * n + k,
+                             3 * n2 + b * n + k])
+        return columns, moves, rows
 
     # TODO (Task 1): override fail_fast
     # If there is an open position with no symbols available
@@ -170,21 +407,114 @@ class SudokuPuzzle(Puzzle):
         True
         """
         # symbols used in the same row | column | subsquare are not allowable
-        # if no allowable symbol is rest for any empty cell, return True 
-        Find_Fail = False
+        # if no allowable symbol is rest for any empty cell, return True
+        if self._dead:
+            return True
         for r in range(self._n):
+            row = self._grid[r]
             for c in range(self._n):
-                if self._grid[r][c] == EMPTY_CELL:
-                    allowed_symbols = (self._symbol_set
-                                    - (self._row_set(r)
-                                        | self._column_set(c)
-                                        | self._subsquare_set(r, c)))
-                    Find_Fail = Find_Fail or len(allowed_symbols) < 1                
-                 
-        return Find_Fail            
-
+                if row[c] == EMPTY_CELL and not self._allowed(r, c):
+                    return True
+        return False
 
     # some private helper methods
+    # Note: the mask helpers below keep every lookup a few integer operations;
+    # the set helpers after them are kept for readability and debugging
+    def _box(self, r: int, c: int) -> int:
+        # Return the index of the subsquare where position r, c occurs.
+        return (r // self._sqn) * self._sqn + c // self._sqn
+
+    def _allowed(self, r: int, c: int) -> int:
+        # Return the mask of the symbols that may still go at position r, c.
+        return self._full & ~(self._row_used[r] | self._col_used[c]
+                              | self._box_used[self._box(r, c)])
+
+    def _mark(self, r: int, c: int, bit: int) -> None:
+        # Record that the symbol represented by <bit> is now at position r, c.
+        self._row_used[r] |= bit
+        self._col_used[c] |= bit
+        self._box_used[self._box(r, c)] |= bit
+
+    def _place(self, r: int, c: int, symbol: str) -> None:
+        # Put <symbol> at position r, c in place, copying row r first.
+        self._grid[r] = self._grid[r][:]
+        self._grid[r][c] = symbol
+        self._empty -= 1
+        self._mark(r, c, self._bits[symbol])
+
+    def _fill_singles(self, filled: List[Tuple[int, int]]) -> None:
+        # Fill naked singles (positions with one legal symbol) and hidden
+        # singles (symbols with one legal position in a row, column or
+        # subsquare) until there are none left, appending each position
+        # filled to <filled>. Set _dead and stop if some empty position has
+        # no legal symbol, or some missing symbol has no legal position.
+        grid, units = self._grid, _units(self._n)
+        progress = True
+        while progress:
+            progress = False
+            for unit in units:
+                once, twice, used = 0, 0, 0
+                for r, c in unit:
+                    if grid[r][c] == EMPTY_CELL:
+                        allowed = self._allowed(r, c)
+                        if not allowed:
+                            self._dead = True
+                            return
+                        if not allowed & (allowed - 1):
+                            self._place(r, c, self._symbol_of[allowed])
+                            filled.append((r, c))
+                            progress = True
+                            used |= allowed
+                        else:
+                            twice |= once & allowed
+                            once |= allowed
+                    else:
+                        used |= self._bits[grid[r][c]]
+                missing = self._full & ~used
+                if missing & ~once:
+                    self._dead = True
+                    return
+                for bit in self._bits_in(once & ~twice & missing):
+                    for r, c in unit:
+                        if (grid[r][c] == EMPTY_CELL
+                                and self._allowed(r, c) & bit):
+                            self._place(r, c, self._symbol_of[bit])
+                            filled.append((r, c))
+                            progress = True
+                            break
+
+    def _bits_in(self, mask: int) -> Iterator[int]:
+        # Yield the single bits set in <mask>, lowest first.
+        while mask:
+            bit = mask & -mask
+            yield bit
+            mask ^= bit
+
+    def _symbols_in(self, mask: int) -> Iterator[str]:
+        # Yield the symbols whose bits are set in <mask>, in sorted order.
+        while mask:
+            bit = mask & -mask
+            yield self._symbol_of[bit]
+            mask ^= bit
+
+    def _with_symbol(self, r: int, c: int, symbol: str) -> SudokuPuzzle:
+        # Return a new puzzle equal to this one but with <symbol> at r, c.
+        # Unchanged rows are shared with this puzzle, and the masks are
+        # updated rather than recomputed from the grid.
+        # NOTE: type(self).__new__ keeps subclasses working, as in extensions
+        child = type(self).__new__(type(self))
+        child.__dict__.update(self.__dict__)
+        child._grid = self._grid[:]
+        child._grid[r] = self._grid[r][:]
+        child._grid[r][c] = symbol
+        child._row_used = self._row_used[:]
+        child._col_used = self._col_used[:]
+        child._box_used = self._box_used[:]
+        child._empty = self._empty - 1
+        child._key = None
+        child._mark(r, c, self._bits[symbol])
+        return child
+
     # Note: these return sets of symbols you may find useful
     def _row_set(self, r: int) -> Set[str]:
         # Return set of symbols in row r of SudokuPuzzle self's grid.
@@ -226,23 +556,336 @@ class SudokuPuzzle(Puzzle):
         Two "solutions" are considered to be equal if the final puzzle
         state is the same.
 
-        Hint: You should find the optional parameter, seen, for the Solver
-        class' solve method very useful here.
+        Only the first two solutions are ever searched for, in a single
+        pass of DlxSolver.count_solutions.
         """
-        from solver import DfsSolver
-        num_solution = 0
-        seen = set()
-        dfsolver = DfsSolver()
+        from solver import DlxSolver
+        return DlxSolver().count_solutions(self, 2) == 1
+
+
+def from_line(line: str, symbols: Optional[str] = None,
+              **options) -> SudokuPuzzle:
+    """
+    Return the SudokuPuzzle written in the line-per-puzzle format as <line>:
+    n * n characters giving the positions in row-major order, where '.' (or
+    '0', unless it is a symbol) is an empty position.
+
+    <symbols> are the n symbols of the puzzle, by default those in
+    LINE_SYMBOLS for its size. <options> are passed on to SudokuPuzzle.
+
+    >>> from_line('1.3..4.2.......3').to_line()
+    '1.3..4.2.......3'
+    """
+    line = line.strip()
+    n = round(len(line) ** (1 / 2))
+    if n * n != len(line):
+        raise ValueError('a puzzle line must have a square number of '
+                         'characters, not %d' % len(line))
+    if symbols is None:
+        symbols = LINE_SYMBOLS[n]
+    empty = ''.join(ch for ch in LINE_EMPTY if ch not in symbols)
+    cells = [EMPTY_CELL if ch in empty else ch for ch in line]
+    unknown = set(cells) - set(symbols) - {EMPTY_CELL}
+    if unknown:
+        raise ValueError('unknown symbols in puzzle line: %s'
+                         % ''.join(sorted(unknown)))
+    grid = [cells[r * n:(r + 1) * n] for r in range(n)]
+    return SudokuPuzzle(n, grid, set(symbols), **options)
+
+
+def _units(n: int) -> List[List[Tuple[int, int]]]:
+    """
+    Return the rows, columns and subsquares of an n x n grid, each as a list
+    of positions.
+    """
+    if n not in _UNITS:
+        sqn = round(n ** (1 / 2))
+        _UNITS[n] = ([[(r, c) for c in range(n)] for r in range(n)]
+                     + [[(r, c) for r in range(n)] for c in range(n)]
+                     + [[(br + i, bc + j) for i in range(sqn)
+                         for j in range(sqn)]
+                        for br in range(0, n, sqn) for bc in range(0, n, sqn)])
+    return _UNITS[n]
+
+
+def _least_form(values: List[List[int]], sqn: int) -> List[Tuple[int, ...]]:
+    """
+    Return the least grid, compared row by row, that <values> can be turned
+    into by the symmetries described in SudokuPuzzle.canonical_key, where 0
+    is an empty position and the symbols are 1 to n. <sqn> is the number of
+    rows in a band.
+
+    The rows are chosen a band and a row at a time, following only the
+    choices that keep the grid so far no greater than the least one found.
+    The column order is not chosen up front but narrowed down by each row
+    (see _refine): columns are only told apart once some row puts different
+    values in them, so the only choices tried are the orders of columns
+    that get symbols no earlier row has, which decide how they are labelled
+    (see _label_orders).
+    """
+    n = sqn * sqn
+    best: List[Tuple[int, ...]] = []
+
+    def search(grid: List[Tuple[int, ...]], rows: List[int],
+               groups: List[List[List[Tuple[int, ...]]]],
+               labels: List[int], label: int) -> None:
+        level = len(rows)
+        if level == n:
+            return
+        # bands with the same rows, and equal rows in a band, lead to the
+        # same forms, so only the first of each is tried
+        if level % sqn == 0:
+            used = {r // sqn for r in rows}
+            bands = {tuple(grid[b * sqn:(b + 1) * sqn]): b
+                     for b in reversed(range(sqn)) if b not in used}
+            candidates = [r for b in sorted(bands.values())
+                          for r in _distinct_rows(grid, b, sqn, rows)]
+        else:
+            candidates = _distinct_rows(grid, rows[-1] // sqn, sqn, rows)
+        low = best[level] if level < len(best) else None
+        options = []
+        for r in candidates:
+            refined = _refine(grid[r], groups, labels, label, low)
+            if refined is None:
+                continue
+            image, refined = refined
+            if low is None or image < low:
+                low, options = image, []
+            options.append((r, refined))
+        if not options:
+            return
+        if level < len(best) and low < best[level]:
+            del best[level:]
+        if level == len(best):
+            best.append(low)
+        for r, refined in options:
+            for next_groups, row_labels, next_label in _label_orders(
+                    grid[r], refined, labels, label):
+                search(grid, rows + [r], next_groups, row_labels, next_label)
+
+    # above 9 x 9, the columns within a stack stay in order, and the grid is
+    # not transposed, as that would turn moves of rows within a band into
+    # moves of columns within a stack
+    grids = [values]
+    if sqn <= 3:
+        grids.append([list(column) for column in zip(*values)])
+    for grid in grids:
+        stacks = [[tuple(range(s * sqn, (s + 1) * sqn))] if sqn <= 3
+                  else [(c,) for c in range(s * sqn, (s + 1) * sqn)]
+                  for s in range(sqn)]
+        search([tuple(row) for row in grid], [], [stacks], [0] * (n + 1), 1)
+    return best
+
+
+def _distinct_rows(grid: List[Tuple[int, ...]], band: int, sqn: int,
+                   used: List[int]) -> List[int]:
+    """
+    Return the first of each set of equal rows of <grid> in <band> that are
+    not in <used>.
+    """
+    first = {grid[r]: r for r in reversed(range(band * sqn, (band + 1) * sqn))
+             if r not in used}
+    return sorted(first.values())
+
+
+def _refine(row: Tuple[int, ...],
+            groups: List[List[List[Tuple[int, ...]]]], labels: List[int],
+            label: int, bound: Optional[Tuple[int, ...]]
+            ) -> Optional[Tuple[Tuple[int, ...],
+                                List[Tuple[bool,
+                                           List[List[Tuple[int, ...]]]]]]]:
+    """
+    Return the least image of <row> that the column orders still open
+    allow, and those orders narrowed down to the ones that give it, or None
+    if the image would be greater than <bound> (if it is not None).
+
+    The open column orders are given by <groups>, a list of groups of
+    stacks that may still go in any order within their group, where each
+    stack is a list of cells of columns that may still go in any order
+    within their cell. Symbols are given their labels in <labels>; those
+    without one come after all labelled symbols, and are labelled from
+    <label> on from left to right once the columns are in order, so the
+    image is the same whichever order they are put in.
+
+    The image puts each cell's columns in order of value and each group's
+    stacks in order of image. The narrowed orders are returned as a list of
+    (whether the stacks have a new symbol, stacks) for each group of stacks
+    with equal images, each stack's cells split into runs of equal value.
+    """
+    new = len(labels)   # greater than any label
+    image: List[int] = []
+    refined = []
+    for group in groups:
+        stacks = []
+        for stack in group:
+            stack_image: List[int] = []
+            cells = []
+            for cell in stack:
+                if len(cell) == 1:
+                    v = row[cell[0]]
+                    stack_image.append(labels[v] or new if v else 0)
+                    cells.append(cell)
+                    continue
+                keyed = sorted((labels[row[c]] or new if row[c] else 0, c)
+                               for c in cell)
+                for key, run in itertools.groupby(keyed, key=lambda kc: kc[0]):
+                    run = tuple(c for _, c in run)
+                    stack_image.extend([key] * len(run))
+                    cells.append(run)
+            stacks.append((stack_image, cells))
+        if len(stacks) > 1:
+            stacks.sort(key=lambda stack: stack[0])
+        start = len(image)
+        for stack_image, tied in itertools.groupby(stacks,
+                                                   key=lambda stack: stack[0]):
+            tied = [cells for _, cells in tied]
+            for _ in tied:
+                for v in stack_image:
+                    if v == new:
+                        v = label
+                        label += 1
+                    image.append(v)
+            refined.append((new in stack_image, tied))
+        if bound is not None:
+            prefix = tuple(image[start:])
+            if prefix > bound[start:len(image)]:
+                return None
+            if prefix < bound[start:len(image)]:
+                bound = None
+    return tuple(image), refined
+
+
+def _label_orders(row: Tuple[int, ...],
+                  refined: List[Tuple[bool, List[List[Tuple[int, ...]]]]],
+                  labels: List[int], label: int
+                  ) -> Iterator[Tuple[List[List[List[Tuple[int, ...]]]],
+                                      List[int], int]]:
+    """
+    Yield each way of ordering the columns of <row> that get new symbols in
+    the narrowed orders <refined> (see _refine), as the open column orders
+    left, the labels with the new symbols labelled from left to right
+    starting at <label>, and the next label still free.
+
+    Only these columns need ordering: the other columns in a cell all have
+    equal values, and stacks with equal images but no new symbol have only
+    empty positions in this row.
+    """
+    choices = []
+    for has_new, stacks in refined:
+        stack_choices = []
+        for stack in stacks:
+            cell_choices = []
+            for cell in stack:
+                if len(cell) > 1 and row[cell[0]] and not labels[row[cell[0]]]:
+                    cell_choices.append([[(c,) for c in order] for order
+                                         in itertools.permutations(cell)])
+                else:
+                    cell_choices.append([[cell]])
+            stack_choices.append(
+                [[cell for cells in picked for cell in cells]
+                 for picked in itertools.product(*cell_choices)])
+        if has_new and len(stacks) > 1:
+            options = [[[stack] for stack in picked]
+                       for order in itertools.permutations(range(len(stacks)))
+                       for picked in itertools.product(
+                           *[stack_choices[i] for i in order])]
+        else:
+            options = [[list(picked)]
+                       for picked in itertools.product(*stack_choices)]
+        choices.append(options)
+    for picked in itertools.product(*choices):
+        groups = [group for option in picked for group in option]
+        row_labels = labels[:]
+        columns = [c for group in groups for stack in group for cell in stack
+                   for c in cell]
+        _, next_label = _relabel(tuple(row[c] for c in columns), row_labels,
+                                 label)
+        yield groups, row_labels, next_label
+
+
+def _relabel(row: Tuple[int, ...], labels: List[int],
+             label: int) -> Tuple[Tuple[int, ...], int]:
+    """
+    Return <row> with each symbol replaced by its label in <labels>, giving
+    symbols without one the next labels from <label> on (and recording them
+    in <labels>), and the next label still free.
+    """
+    relabelled = []
+    for v in row:
+        if v:
+            if not labels[v]:
+                labels[v] = label
+                label += 1
+            relabelled.append(labels[v])
+        else:
+            relabelled.append(0)
+    return tuple(relabelled), label
+
+
+class BranchingStrategy:
+    """
+    A rule for choosing which empty position of a SudokuPuzzle its
+    extensions fill in. This is an abstract class.
+    """
+
+    def choose(self, puzzle: SudokuPuzzle) -> Optional[Tuple[int, int]]:
+        """
+        Return the (row, column) of the empty position of <puzzle> to branch
+        on, or None if <puzzle> has no empty positions.
+        """
+        raise NotImplementedError
 
-        while True:
-            ret = dfsolver.solve(self, seen)
-            if ret != []:
-                num_solution += 1
-                seen.add(str(ret[-1]))
-            else:
-                break    
 
-        return num_solution == 1
+class FirstEmptyCell(BranchingStrategy):
+    """
+    Branch on the first empty position in row-major order.
+    """
+
+    def choose(self, puzzle: SudokuPuzzle) -> Optional[Tuple[int, int]]:
+        """
+        Return the first empty position of <puzzle> in row-major order, or
+        None if there is none.
+        """
+        grid = puzzle._grid
+        for r in range(puzzle._n):
+            if EMPTY_CELL in grid[r]:
+                return r, grid[r].index(EMPTY_CELL)
+        return None
+
+
+class MinimumRemainingValues(BranchingStrategy):
+    """
+    Branch on an empty position with the fewest legal symbols (the most
+    constrained position), so that dead ends are found as early as possible.
+    Ties go to the first such position in row-major order.
+    """
+
+    def choose(self, puzzle: SudokuPuzzle) -> Optional[Tuple[int, int]]:
+        """
+        Return the empty position of <puzzle> with the fewest legal symbols,
+        or None if there is none.
+
+        >>> s = SudokuPuzzle(4, [["A", " ", " ", " "], [" ", " ", "A", "B"], \
+        [" ", " ", " ", " "], [" ", " ", " ", " "]], {"A", "B", "C", "D"})
+        >>> MinimumRemainingValues().choose(s)
+        (0, 2)
+        """
+        best, best_count = None, puzzle._n + 1
+        grid = puzzle._grid
+        for r in range(puzzle._n):
+            row = grid[r]
+            for c in range(puzzle._n):
+                if row[c] == EMPTY_CELL:
+                    count = bin(puzzle._allowed(r, c)).count('1')
+                    if count < best_count:
+                        best, best_count = (r, c), count
+                        if count <= 1:
+                            return best
+        return best
+
+
+# the branching strategy SudokuPuzzles use unless they are given another
+FIRST_EMPTY = FirstEmptyCell()
 
 
 if __name__ == "__main__":